@@ -0,0 +1,108 @@
+"""
+one long-lived process that searches the moves of the computer player, so
+the gui doesn't start a new process and pickle the whole GameState for every
+move; the worker keeps its own GameState and only gets told what changed:
+ ("move", packed move), ("undo",), ("reset", fen) and ("search", id, depth, time limit)
+the answer ("result", id, packed move) is picked up with poll() once per frame,
+and a search that isn't wanted anymore (undo, reset) is cancelled through a
+shared number instead of terminate(), which keeps the worker and its
+transposition table alive for the next move
+"""
+
+import queue
+from multiprocessing import Process, Queue, Value
+
+from chessEngine import GameState, Move
+from smartMoveFinder import MAX_DEPTH, Search, findBookMove
+
+
+class AIWorker:
+    def __init__(self, maxDepth=MAX_DEPTH, timeLimit=None):
+        self.maxDepth = maxDepth
+        self.timeLimit = timeLimit
+        self.requests = Queue()
+        self.results = Queue()
+        # every search with an id up to this one is cancelled
+        self.cancelledId = Value("i", 0)
+        self.searchId = 0
+        self.thinking = False
+        self.process = Process(
+            target=workerLoop, args=(self.requests, self.results, self.cancelledId), daemon=True
+        )
+        self.process.start()
+
+    def reset(self, fen=None):
+        self.cancel()
+        self.requests.put(("reset", fen))
+
+    def pushMove(self, move):
+        self.cancel()
+        self.requests.put(("move", move.code))
+
+    def popMove(self):
+        self.cancel()
+        self.requests.put(("undo",))
+
+    def requestMove(self):
+        self.searchId += 1
+        self.thinking = True
+        self.requests.put(("search", self.searchId, self.maxDepth, self.timeLimit))
+
+    """
+    never blocks, returns the Move of the search once it's done and None
+    while the worker is still thinking (or nothing was asked)
+    """
+
+    def poll(self):
+        while self.thinking:
+            try:
+                _, searchId, move = self.results.get_nowait()
+            except queue.Empty:
+                return None
+            # answers of cancelled searches can still be on their way, they're dropped
+            if searchId == self.searchId:
+                self.thinking = False
+                return Move.fromCode(move) if move is not None else None
+        return None
+
+    def cancel(self):
+        if self.thinking:
+            self.cancelledId.value = self.searchId
+            self.thinking = False
+
+    def close(self):
+        self.cancel()
+        self.requests.put(("quit",))
+        self.process.join(1)
+        if self.process.is_alive():
+            self.process.terminate()
+
+
+def workerLoop(requests, results, cancelledId):
+    gs = GameState()
+    runningId = [0]
+    search = Search(stopCheck=lambda: cancelledId.value >= runningId[0])
+    while True:
+        request = requests.get()
+        kind = request[0]
+        if kind == "move":
+            gs.makeMoveCode(request[1])
+        elif kind == "undo":
+            if gs.moveCodeLog:
+                gs.undoMoveCode()
+        elif kind == "reset":
+            gs = GameState(fen=request[1])
+            search.newGame()
+        elif kind == "search":
+            _, searchId, maxDepth, timeLimit = request
+            runningId[0] = searchId
+            if cancelledId.value >= searchId:
+                continue
+            bookMove = findBookMove(gs)
+            if bookMove is not None:
+                results.put(("result", searchId, bookMove))
+                continue
+            result = search.iterativeDeepening(gs, maxDepth, timeLimit=timeLimit)
+            results.put(("result", searchId, result.bestMove))
+        elif kind == "quit":
+            return
@@ -0,0 +1,89 @@
+"""
+compares walking the game tree with Move objects (getValidMoves/makeMove)
+against the packed int moves the search uses (getValidMoveCodes/makeMoveCode),
+reports time per node, the bytes of move objects allocated per node
+and the peak memory of the walk
+
+usage: python allocBenchmark.py [depth]
+"""
+
+import gc
+import sys
+import time
+import tracemalloc
+
+from chessEngine import GameState
+
+
+def walkMoveObjects(gs, depth):
+    moves = gs.getValidMoves()
+    if depth == 1:
+        return 1 + len(moves)
+    nodes = 1
+    for move in moves:
+        gs.makeMove(move)
+        nodes += walkMoveObjects(gs, depth - 1)
+        gs.undoMove()
+    return nodes
+
+
+def walkPackedMoves(gs, depth):
+    moves = gs.getValidMoveCodes()
+    if depth == 1:
+        return 1 + len(moves)
+    nodes = 1
+    for move in moves:
+        gs.makeMoveCode(move)
+        nodes += walkPackedMoves(gs, depth - 1)
+        gs.undoMoveCode()
+    return nodes
+
+
+def measure(walk, depth, bytesPerMove):
+    gc.collect()
+    start = time.perf_counter()
+    nodes = walk(GameState(), depth)
+    elapsed = time.perf_counter() - start
+    # a second run under tracemalloc for the memory numbers, it's too slow to time
+    tracemalloc.start()
+    walk(GameState(), depth)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "nodes": nodes,
+        "seconds": elapsed,
+        "usPerNode": elapsed / nodes * 1e6,
+        # every node but the root was generated as a move once
+        "moveBytesPerNode": (nodes - 1) / nodes * bytesPerMove,
+        "peakBytes": peak,
+    }
+
+
+def main():
+    depth = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    gs = GameState()
+    move = gs.getValidMoves()[0]
+    codeBytes = sys.getsizeof(move.code)
+    # a Move still carries its packed code with it
+    moveBytes = sys.getsizeof(move) + codeBytes
+    print("bytes per move: Move %d, packed int %d" % (moveBytes, codeBytes))
+    for name, walk, bytesPerMove in (
+        ("Move objects", walkMoveObjects, moveBytes),
+        ("packed moves", walkPackedMoves, codeBytes),
+    ):
+        result = measure(walk, depth, bytesPerMove)
+        print(
+            "%-13s nodes %d  %.2fs  %.1f us/node  %.0f move bytes/node  peak %d KB"
+            % (
+                name,
+                result["nodes"],
+                result["seconds"],
+                result["usPerNode"],
+                result["moveBytesPerNode"],
+                result["peakBytes"] // 1024,
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+where every piece can go from every square, worked out once at import so the
+move generators and attack tests of the list board only walk ready-made lists
+and never do the row/col arithmetic or the bounds checks themselves.
+every target is a (row, col, square) tuple, square = row * 8 + col, and all of
+them are already clipped to the board:
+ KNIGHT_TARGETS[sq] and KING_TARGETS[sq]  the squares a knight or king jumps to
+ PAWN_TARGETS[color][sq]                  the two (or one) squares a pawn of that color captures on
+ RAYS[sq][d]                              the squares in direction KING_MOVES[d], nearest first;
+                                          directions 0-3 are straight, 4-7 diagonal
+ ROOK_RAYS[sq], BISHOP_RAYS[sq]           the straight and the diagonal rays of RAYS[sq]
+"""
+
+KNIGHT_MOVES = ((-1, -2), (-1, 2), (-2, -1), (-2, 1), (1, -2), (1, 2), (2, -1), (2, 1))
+KING_MOVES = ((-1, 0), (0, -1), (1, 0), (0, 1), (-1, -1), (-1, 1), (1, -1), (1, 1))
+
+
+def jumpTargets(offsets):
+    table = []
+    for sq in range(64):
+        r, c = divmod(sq, 8)
+        table.append(
+            tuple(
+                (r + dRow, c + dCol, (r + dRow) * 8 + c + dCol)
+                for dRow, dCol in offsets
+                if 0 <= r + dRow < 8 and 0 <= c + dCol < 8
+            )
+        )
+    return tuple(table)
+
+
+def ray(sq, dRow, dCol):
+    r, c = divmod(sq, 8)
+    squares = []
+    r += dRow
+    c += dCol
+    while 0 <= r < 8 and 0 <= c < 8:
+        squares.append((r, c, r * 8 + c))
+        r += dRow
+        c += dCol
+    return tuple(squares)
+
+
+KNIGHT_TARGETS = jumpTargets(KNIGHT_MOVES)
+KING_TARGETS = jumpTargets(KING_MOVES)
+# white pawns capture up the board (towards row 0), black pawns down
+PAWN_TARGETS = {"w": jumpTargets(((-1, -1), (-1, 1))), "b": jumpTargets(((1, -1), (1, 1)))}
+RAYS = tuple(tuple(ray(sq, dRow, dCol) for dRow, dCol in KING_MOVES) for sq in range(64))
+ROOK_RAYS = tuple(rays[:4] for rays in RAYS)
+BISHOP_RAYS = tuple(rays[4:] for rays in RAYS)
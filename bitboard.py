@@ -0,0 +1,208 @@
+"""
+bitboard representation of the board, every piece type of every color is a
+python int where bit (row * 8 + col) is set when that piece stands on the square,
+so bit 0 is a8 and bit 63 is h1 just like indexing GameState.board row by row
+"""
+
+from attackTables import KING_TARGETS, KNIGHT_TARGETS, PAWN_TARGETS
+from moveEncoding import CASTLE_FLAG, ENPASSANT_FLAG, PIECE_NAMES
+
+PIECES = PIECE_NAMES[1:]
+FULL = (1 << 64) - 1
+
+
+def squareMask(r, c):
+    return 1 << (r * 8 + c)
+
+
+def targetMasks(targets):
+    # the (row, col, square) targets of attackTables as one mask per square
+    return [sum(1 << endSq for _, _, endSq in squareTargets) for squareTargets in targets]
+
+
+def lineMask(sq, dRow, dCol):
+    # every square on the line through sq in both directions, without sq itself
+    r, c = divmod(sq, 8)
+    mask = 0
+    for sign in (1, -1):
+        endRow, endCol = r + dRow * sign, c + dCol * sign
+        while 0 <= endRow < 8 and 0 <= endCol < 8:
+            mask |= squareMask(endRow, endCol)
+            endRow += dRow * sign
+            endCol += dCol * sign
+    return mask
+
+
+KNIGHT_ATTACKS = targetMasks(KNIGHT_TARGETS)
+KING_ATTACKS = targetMasks(KING_TARGETS)
+# squares a pawn of the given color standing on sq attacks
+PAWN_ATTACKS = {color: targetMasks(targets) for color, targets in PAWN_TARGETS.items()}
+
+
+def slidingAttacks(sq, dRow, dCol, occupied):
+    # the squares a slider on sq reaches along one line, up to and including the first blocker each way
+    r, c = divmod(sq, 8)
+    attacks = 0
+    for sign in (1, -1):
+        endRow, endCol = r + dRow * sign, c + dCol * sign
+        while 0 <= endRow < 8 and 0 <= endCol < 8:
+            attacks |= squareMask(endRow, endCol)
+            if occupied & squareMask(endRow, endCol):
+                break
+            endRow += dRow * sign
+            endCol += dCol * sign
+    return attacks
+
+
+"""
+for every square the mask of one line through it and a dict from each
+occupancy of that line (occupied & mask) to the squares a slider attacks,
+every subset of the mask is visited once by the carry-rippler trick
+"""
+
+
+def buildLineAttacks(dRow, dCol):
+    masks = []
+    tables = []
+    for sq in range(64):
+        mask = lineMask(sq, dRow, dCol)
+        table = {}
+        subset = 0
+        while True:
+            table[subset] = slidingAttacks(sq, dRow, dCol, subset)
+            subset = (subset - mask) & mask
+            if not subset:
+                break
+        masks.append(mask)
+        tables.append(table)
+    return masks, tables
+
+
+FILE_MASKS, FILE_ATTACKS = buildLineAttacks(1, 0)
+DIAGONAL_MASKS, DIAGONAL_ATTACKS = buildLineAttacks(1, 1)
+ANTI_DIAGONAL_MASKS, ANTI_DIAGONAL_ATTACKS = buildLineAttacks(1, -1)
+
+
+def buildRankAttacks():
+    # RANK_ATTACKS[col][occupancy of the rank] -> attacked columns of that rank
+    table = []
+    for c in range(8):
+        row = []
+        for occupancy in range(256):
+            attacks = 0
+            for step in (1, -1):
+                endCol = c + step
+                while 0 <= endCol < 8:
+                    attacks |= 1 << endCol
+                    if occupancy & (1 << endCol):
+                        break
+                    endCol += step
+            row.append(attacks)
+        table.append(row)
+    return table
+
+
+RANK_ATTACKS = buildRankAttacks()
+
+
+def rankAttacks(occupied, sq):
+    shift = sq & ~7
+    return RANK_ATTACKS[sq & 7][(occupied >> shift) & 0xFF] << shift
+
+
+def bishopAttacks(occupied, sq):
+    return (
+        DIAGONAL_ATTACKS[sq][occupied & DIAGONAL_MASKS[sq]]
+        | ANTI_DIAGONAL_ATTACKS[sq][occupied & ANTI_DIAGONAL_MASKS[sq]]
+    )
+
+
+def rookAttacks(occupied, sq):
+    return FILE_ATTACKS[sq][occupied & FILE_MASKS[sq]] | rankAttacks(occupied, sq)
+
+
+def squares(bb):
+    # yields the index of every set bit, lowest first
+    while bb:
+        lowest = bb & -bb
+        yield lowest.bit_length() - 1
+        bb ^= lowest
+
+
+class Bitboards:
+    def __init__(self, board):
+        self.pieces = dict.fromkeys(PIECES, 0)
+        self.colors = {"w": 0, "b": 0}
+        self.occupied = 0
+        for r in range(8):
+            for c in range(8):
+                if board[r][c] != "--":
+                    self.toggle(board[r][c], r * 8 + c)
+
+    def toggle(self, piece, sq):
+        bit = 1 << sq
+        self.pieces[piece] ^= bit
+        self.colors[piece[0]] ^= bit
+        self.occupied ^= bit
+
+    """
+    every change a move makes is a toggle, so calling this a second time
+    with the same packed move takes it back
+    """
+
+    def applyMove(self, move):
+        startSq = move & 63
+        endSq = move >> 6 & 63
+        flag = move >> 12 & 3
+        pieceMoved = PIECE_NAMES[move >> 22 & 15]
+        pieceCaptured = PIECE_NAMES[move >> 18 & 15]
+        promotion = move >> 14 & 15
+        self.toggle(pieceMoved, startSq)
+        if flag == ENPASSANT_FLAG:
+            self.toggle(pieceCaptured, (startSq & ~7) | (endSq & 7))
+        elif pieceCaptured != "--":
+            self.toggle(pieceCaptured, endSq)
+        self.toggle(PIECE_NAMES[promotion] if promotion else pieceMoved, endSq)
+        if flag == CASTLE_FLAG:
+            rook = pieceMoved[0] + "R"
+            if endSq - startSq == 2:
+                self.toggle(rook, endSq + 1)
+                self.toggle(rook, endSq - 1)
+            else:
+                self.toggle(rook, endSq - 2)
+                self.toggle(rook, endSq + 1)
+
+    def attackersOf(self, sq, color):
+        # bitboard of every piece of the given color attacking sq
+        enemy = "b" if color == "w" else "w"
+        pieces = self.pieces
+        occupied = self.occupied
+        queens = pieces[color + "Q"]
+        return (
+            (PAWN_ATTACKS[enemy][sq] & pieces[color + "p"])
+            | (KNIGHT_ATTACKS[sq] & pieces[color + "N"])
+            | (KING_ATTACKS[sq] & pieces[color + "K"])
+            | (bishopAttacks(occupied, sq) & (pieces[color + "B"] | queens))
+            | (rookAttacks(occupied, sq) & (pieces[color + "R"] | queens))
+        )
+
+    """
+    occupied stands in for the real occupancy when given, so a king move can be
+    tested with the king already lifted off its square
+    """
+
+    def isSquareAttacked(self, sq, color, occupied=None):
+        if occupied is None:
+            occupied = self.occupied
+        enemy = "b" if color == "w" else "w"
+        pieces = self.pieces
+        if PAWN_ATTACKS[enemy][sq] & pieces[color + "p"]:
+            return True
+        if KNIGHT_ATTACKS[sq] & pieces[color + "N"]:
+            return True
+        if KING_ATTACKS[sq] & pieces[color + "K"]:
+            return True
+        queens = pieces[color + "Q"]
+        if bishopAttacks(occupied, sq) & (pieces[color + "B"] | queens):
+            return True
+        return bool(rookAttacks(occupied, sq) & (pieces[color + "R"] | queens))
@@ -1,5 +1,124 @@
+import random
+import struct
+
+from attackTables import BISHOP_RAYS, KING_MOVES, KING_TARGETS, KNIGHT_TARGETS, PAWN_TARGETS, RAYS, ROOK_RAYS
+from bitboard import (
+    FULL,
+    KING_ATTACKS,
+    KNIGHT_ATTACKS,
+    PAWN_ATTACKS,
+    Bitboards,
+    bishopAttacks,
+    rookAttacks,
+    squares,
+)
+from evaluation import PIECE_SQUARE_SCORES, computeBoardScore
+from moveEncoding import CASTLE_FLAG, ENPASSANT_FLAG, NULL_MOVE, PIECE_CODES, PIECE_NAMES, encodeMove
+
+# zobrist keys used to hash a position into a single 64-bit number,
+# the generator is seeded so the same position gets the same key in every process
+zobristRandom = random.Random(20240101)
+zobristPieces = {
+    piece: [zobristRandom.getrandbits(64) for _ in range(64)]
+    for piece in ("wp", "wN", "wB", "wR", "wQ", "wK", "bp", "bN", "bB", "bR", "bQ", "bK")
+}
+# one key for every combination of the 4 castling rights
+zobristCastle = [zobristRandom.getrandbits(64) for _ in range(16)]
+# one key for each file an en-passant capture can happen on
+zobristEnpassant = [zobristRandom.getrandbits(64) for _ in range(8)]
+zobristBlackToMove = zobristRandom.getrandbits(64)
+
+# the promotion field of every move a pawn reaching the last rank has, the queen first
+PROMOTION_CODES = {color: tuple(PIECE_CODES[color + pieceType] << 14 for pieceType in "QRBN") for color in "wb"}
+# the quiescence search only looks at promotions to a queen
+QUEEN_PROMOTION_CODES = {color: PROMOTION_CODES[color][:1] for color in "wb"}
+NO_PROMOTION = (0,)
+
+# the castling rights are one 4-bit mask (GameState.currentCastlingRights),
+# the mask is also the index into zobristCastle
+WHITE_KING_SIDE = 1
+WHITE_QUEEN_SIDE = 2
+BLACK_KING_SIDE = 4
+BLACK_QUEEN_SIDE = 8
+ALL_CASTLING_RIGHTS = 15
+CASTLING_FEN_CHARS = (
+    ("K", WHITE_KING_SIDE),
+    ("Q", WHITE_QUEEN_SIDE),
+    ("k", BLACK_KING_SIDE),
+    ("q", BLACK_QUEEN_SIDE),
+)
+# the rights that survive a move from or to each square: a king or rook leaving
+# its start square, or a rook taken on it, drops the rights that need it
+CASTLING_RIGHTS_KEPT = [ALL_CASTLING_RIGHTS] * 64
+CASTLING_RIGHTS_KEPT[56] &= ~WHITE_QUEEN_SIDE
+CASTLING_RIGHTS_KEPT[63] &= ~WHITE_KING_SIDE
+CASTLING_RIGHTS_KEPT[60] &= ~(WHITE_KING_SIDE | WHITE_QUEEN_SIDE)
+CASTLING_RIGHTS_KEPT[0] &= ~BLACK_QUEEN_SIDE
+CASTLING_RIGHTS_KEPT[7] &= ~BLACK_KING_SIDE
+CASTLING_RIGHTS_KEPT[4] &= ~(BLACK_KING_SIDE | BLACK_QUEEN_SIDE)
+
+# GameState.undoStack packs what a move can't be taken back from into one int:
+# the castling rights (bits 0-3), the en-passant file + 1 (bits 4-7, 0 for none)
+# and the halfmove clock (bits 8 and up); the stack doubles when a game outgrows it
+UNDO_STACK_SIZE = 256
+# (row, col) of every square and the en-passant square of every file, indexed by
+# whiteToMove, shared so making and taking back moves doesn't build tuples
+SQUARE_COORDS = tuple(divmod(sq, 8) for sq in range(64))
+ENPASSANT_SQUARES = (tuple((5, c) for c in range(8)), tuple((2, c) for c in range(8)))
+
+# GameState.toBytes(): the 64 squares as piece codes (see moveEncoding), two to a
+# byte from a8 on, then the castling rights with black to move as bit 4, the
+# en-passant file + 1 (0 for none), the halfmove clock and the fullmove number
+PACKED_POSITION = struct.Struct(">32sBBHH")
+# the two squares of every board byte, None for a byte that isn't two piece codes
+SQUARE_PAIRS = [
+    (PIECE_NAMES[byte >> 4], PIECE_NAMES[byte & 15])
+    if byte >> 4 < len(PIECE_NAMES) and byte & 15 < len(PIECE_NAMES)
+    else None
+    for byte in range(256)
+]
+
+# the position a new game starts from
+START_FEN = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+
+
+"""
+how much a packed move changes GameState.boardScore: the moved piece leaves its
+square, the placed piece (a queen after promotion) arrives, a captured piece
+disappears and when castling the rook hops over the king
+"""
+
+
+def scoreDelta(move):
+    startSq = move & 63
+    endSq = move >> 6 & 63
+    flag = move >> 12 & 3
+    pieceMoved = move >> 22 & 15
+    pieceCaptured = move >> 18 & 15
+    promotion = move >> 14 & 15
+    delta = PIECE_SQUARE_SCORES[promotion or pieceMoved][endSq] - PIECE_SQUARE_SCORES[pieceMoved][startSq]
+    if flag == ENPASSANT_FLAG:
+        delta -= PIECE_SQUARE_SCORES[pieceCaptured][(startSq & ~7) | (endSq & 7)]
+    elif pieceCaptured:
+        delta -= PIECE_SQUARE_SCORES[pieceCaptured][endSq]
+    elif flag == CASTLE_FLAG:
+        rook = PIECE_CODES[PIECE_NAMES[pieceMoved][0] + "R"]
+        if endSq - startSq == 2:
+            delta += PIECE_SQUARE_SCORES[rook][endSq - 1] - PIECE_SQUARE_SCORES[rook][endSq + 1]
+        else:
+            delta += PIECE_SQUARE_SCORES[rook][endSq + 1] - PIECE_SQUARE_SCORES[rook][endSq - 2]
+    return delta
+
+
 class GameState:
-    def __init__(self):
+    """
+    useBitboards keeps a Bitboards copy of the position next to the board and
+    switches move generation and attack tests over to set operations on it,
+    fen (a FEN string) or packed (see toBytes()) starts the game from that
+    position instead of the start position
+    """
+
+    def __init__(self, useBitboards=False, fen=None, packed=None):
         self.board = [
             ["bR", "bN", "bB", "bQ", "bK", "bB", "bN", "bR"],  # 8th rank
             ["bp", "bp", "bp", "bp", "bp", "bp", "bp", "bp"],  # 7th rank
@@ -13,6 +132,8 @@ class GameState:
 
         self.whiteToMove = True
         self.moveLog = []
+        # the packed moves that are on the board right now, including the ones the search plays
+        self.moveCodeLog = []
         self.moveFunctions = {
             "p": self.getPawnMove,
             "N": self.getKnightMove,
@@ -26,132 +147,411 @@ class GameState:
         self.checkmate = False
         self.stalemate = False
         self.enpassantPossible = ()
-        self.enpassantPossibleLog = [self.enpassantPossible]
-        self.currentCastlingRights = CastleRights(True, True, True, True)
-        self.castleRightLog = [
-            CastleRights(
-                self.currentCastlingRights.wks,
-                self.currentCastlingRights.bks,
-                self.currentCastlingRights.wqs,
-                self.currentCastlingRights.bqs,
-            )
-        ]
+        self.currentCastlingRights = ALL_CASTLING_RIGHTS
+        self.undoStack = [0] * UNDO_STACK_SIZE
+        self.undoCount = 0
+        # half moves since the last capture or pawn move, for the fifty-move rule
+        self.halfmoveClock = 0
+        # the fullmove number of the position the game started from
+        self.startFullmove = 1
+        if fen is not None:
+            self.loadFen(fen)
+        elif packed is not None:
+            self.loadBytes(packed)
+        self.zobristKey = self.computeZobristKey()
+        self.zobristLog = [self.zobristKey]
+        # how often every position of zobristLog is on it, so a repetition is one lookup;
+        # a null move starts a new count (see makeNullMove()) and parks the old one here
+        self.positionCounts = {self.zobristKey: 1}
+        self.positionCountsLog = []
+        self.bitboards = Bitboards(self.board) if useBitboards else None
+        # material and square scores of the position in tenths of a pawn, good for white when positive
+        self.boardScore = computeBoardScore(self.board)
+        # pieces on the board (kings included), the search checks it before probing the tablebases
+        self.pieceCount = sum(piece != "--" for row in self.board for piece in row)
 
-    def makeMove(self, move):
-        self.board[move.startRow][move.startCol] = "--"
-        self.board[move.endRow][move.endCol] = move.pieceMoved
-        self.moveLog.append(move)
-        self.whiteToMove = not self.whiteToMove 
-        if move.pieceMoved == "wK":
-            self.whiteKingLocation = (move.endRow, move.endCol)
-        elif move.pieceMoved == "bK":
-            self.blackKingLocation = (move.endRow, move.endCol)
-        if move.isPawnPromotion:
-            self.board[move.endRow][move.endCol] = move.pieceMoved[0] + "Q"
-        if move.isEnpassantMove:
-            self.board[move.startRow][move.endCol] = "--" 
-        if move.pieceMoved[1] == "p" and abs(move.startRow - move.endRow) == 2:
-            self.enpassantPossible = ((move.startRow + move.endRow) // 2, move.startCol)
-        else:
+    """
+    reads the board, side to move, castling rights, en-passant square, halfmove
+    clock and fullmove number of a FEN string; only called from __init__()
+    since the keys, bitboards and scores are built from the board after it
+    """
+
+    def loadFen(self, fen):
+        fields = fen.split()
+        if len(fields) < 4:
+            raise ValueError("not a FEN string: %r" % fen)
+        ranks = fields[0].split("/")
+        if len(ranks) != 8:
+            raise ValueError("a FEN board needs 8 ranks: %r" % fen)
+        self.board = []
+        for r, rank in enumerate(ranks):
+            row = []
+            for char in rank:
+                if char.isdigit():
+                    row.extend(["--"] * int(char))
+                elif char.upper() in "PNBRQK":
+                    color = "w" if char.isupper() else "b"
+                    pieceType = "p" if char.upper() == "P" else char.upper()
+                    row.append(color + pieceType)
+                    if pieceType == "K":
+                        if color == "w":
+                            self.whiteKingLocation = (r, len(row) - 1)
+                        else:
+                            self.blackKingLocation = (r, len(row) - 1)
+                else:
+                    raise ValueError("unknown piece %r in FEN %r" % (char, fen))
+            if len(row) != 8:
+                raise ValueError("a FEN rank needs 8 squares: %r" % fen)
+            self.board.append(row)
+        self.whiteToMove = fields[1] == "w"
+        castling = fields[2]
+        self.currentCastlingRights = 0
+        for char, right in CASTLING_FEN_CHARS:
+            if char in castling:
+                self.currentCastlingRights |= right
+        if fields[3] == "-":
             self.enpassantPossible = ()
-        if move.isCastleMove:
-            if move.endCol - move.startCol == 2:
-                self.board[move.endRow][move.endCol - 1] = self.board[move.endRow][move.endCol + 1]
-                self.board[move.endRow][move.endCol + 1] = "--"
-            elif move.endCol - move.startCol == -2:
-                self.board[move.endRow][move.endCol + 1] = self.board[move.endRow][move.endCol - 2]
-                self.board[move.endRow][move.endCol - 2] = "--"
-        self.enpassantPossibleLog.append(self.enpassantPossible)
-        self.updateCastlRights(move)
-        self.castleRightLog.append(
-            CastleRights(
-                self.currentCastlingRights.wks,
-                self.currentCastlingRights.bks,
-                self.currentCastlingRights.wqs,
-                self.currentCastlingRights.bqs,
-            )
+        else:
+            self.enpassantPossible = (Move.ranksToRows[fields[3][1]], Move.fileToCols[fields[3][0]])
+        if len(fields) > 4:
+            if not fields[4].isdigit():
+                raise ValueError("not a halfmove clock in FEN %r" % fen)
+            self.halfmoveClock = int(fields[4])
+        if len(fields) > 5:
+            if not fields[5].isdigit():
+                raise ValueError("not a fullmove number in FEN %r" % fen)
+            self.startFullmove = int(fields[5])
+
+    """
+    the same as loadFen() for a position packed by toBytes()
+    """
+
+    def loadBytes(self, packed):
+        if len(packed) != PACKED_POSITION.size:
+            raise ValueError("a packed position has %d bytes, not %d" % (PACKED_POSITION.size, len(packed)))
+        squares, flags, enpassantFile, self.halfmoveClock, self.startFullmove = PACKED_POSITION.unpack(packed)
+        self.board = []
+        for r in range(8):
+            row = []
+            for byte in squares[r * 4 : r * 4 + 4]:
+                pair = SQUARE_PAIRS[byte]
+                if pair is None:
+                    raise ValueError("not a packed position: %r" % packed)
+                row.extend(pair)
+            if "wK" in row:
+                self.whiteKingLocation = (r, row.index("wK"))
+            if "bK" in row:
+                self.blackKingLocation = (r, row.index("bK"))
+            self.board.append(row)
+        self.currentCastlingRights = flags & ALL_CASTLING_RIGHTS
+        self.whiteToMove = not flags & 16
+        self.enpassantPossible = ENPASSANT_SQUARES[self.whiteToMove][enpassantFile - 1] if enpassantFile else ()
+
+    """
+    the fullmove number of the position on the board, counted from the one the game started from
+    """
+
+    def fullmoveNumber(self):
+        # an even number of half moves since the start leaves the side that started to move
+        startedWithBlack = (len(self.moveCodeLog) % 2 == 0) != self.whiteToMove
+        return self.startFullmove + (len(self.moveCodeLog) + startedWithBlack) // 2
+
+    def toFen(self):
+        ranks = []
+        for row in self.board:
+            rank = ""
+            empty = 0
+            for piece in row:
+                if piece == "--":
+                    empty += 1
+                    continue
+                if empty:
+                    rank += str(empty)
+                    empty = 0
+                rank += piece[1].upper() if piece[0] == "w" else piece[1].lower()
+            if empty:
+                rank += str(empty)
+            ranks.append(rank)
+        castling = "".join(char for char, right in CASTLING_FEN_CHARS if self.currentCastlingRights & right)
+        if self.enpassantPossible != ():
+            row, col = self.enpassantPossible
+            enpassant = Move.colsToFiles[col] + Move.rowsToRanks[row]
+        else:
+            enpassant = "-"
+        return "%s %s %s %s %d %d" % (
+            "/".join(ranks),
+            "w" if self.whiteToMove else "b",
+            castling or "-",
+            enpassant,
+            self.halfmoveClock,
+            self.fullmoveNumber(),
         )
 
+    """
+    the position in PACKED_POSITION.size (38) bytes, without the moves that led to
+    it; GameState.fromBytes() turns it back into a GameState, so a position costs
+    the same to send to another process or to store however long its game is
+    """
+
+    def toBytes(self):
+        squares = bytearray(32)
+        i = 0
+        for row in self.board:
+            for c in range(0, 8, 2):
+                squares[i] = PIECE_CODES[row[c]] << 4 | PIECE_CODES[row[c + 1]]
+                i += 1
+        enpassantFile = self.enpassantPossible[1] + 1 if self.enpassantPossible != () else 0
+        return PACKED_POSITION.pack(
+            bytes(squares),
+            self.currentCastlingRights | (0 if self.whiteToMove else 16),
+            enpassantFile,
+            self.halfmoveClock,
+            self.fullmoveNumber(),
+        )
+
+    @classmethod
+    def fromBytes(cls, packed, useBitboards=False):
+        return cls(useBitboards=useBitboards, packed=packed)
+
+    """
+    toBytes() of the position after the last capture or pawn move and the packed
+    moves played since, which is all a repetition or the fifty-move rule can reach
+    back to: fromBytes() of it with the moves replayed sees the same draws as this
+    game, and it never gets longer than about a hundred moves
+    """
+
+    def recentHistory(self):
+        moves = self.moveCodeLog[len(self.moveCodeLog) - min(self.halfmoveClock, len(self.moveCodeLog)) :]
+        for _ in moves:
+            self.undoMoveCode()
+        packed = self.toBytes()
+        for move in moves:
+            self.makeMoveCode(move)
+        return packed, moves
+
+    """
+    builds the zobrist key of the current position from scratch,
+    makeMove() keeps it up to date after that
+    """
+
+    def computeZobristKey(self):
+        key = 0
+        for r in range(8):
+            for c in range(8):
+                piece = self.board[r][c]
+                if piece != "--":
+                    key ^= zobristPieces[piece][r * 8 + c]
+        key ^= zobristCastle[self.currentCastlingRights]
+        if self.enpassantPossible != ():
+            key ^= zobristEnpassant[self.enpassantPossible[1]]
+        if not self.whiteToMove:
+            key ^= zobristBlackToMove
+        return key
+
+    def makeMove(self, move):
+        self.makeMoveCode(move.code)
+        self.moveLog.append(move)
+
     def undoMove(self):
         if len(self.moveLog) != 0:
-            move = self.moveLog.pop()
-            self.board[move.startRow][move.startCol] = move.pieceMoved
-            self.board[move.endRow][move.endCol] = move.pieceCaptured
-            self.whiteToMove = not self.whiteToMove 
-            if move.pieceMoved == "wK":
-                self.whiteKingLocation = (move.startRow, move.startCol)
-            elif move.pieceMoved == "bK":
-                self.blackKingLocation = (move.startRow, move.startCol)
-            self.checkmate = False
-            self.stalemate = False
-            if move.isEnpassantMove:
-                self.board[move.endRow][move.endCol] = "--"
-                self.board[move.startRow][move.endCol] = move.pieceCaptured
-            self.enpassantPossibleLog.pop()
-            self.enpassantPossible = self.enpassantPossibleLog[-1]
-            self.castleRightLog.pop()
-            newRights = self.castleRightLog[-1]
-            self.currentCastlingRights = CastleRights(newRights.wks, newRights.bks, newRights.wqs, newRights.bqs)
-            if move.isCastleMove:
-                if move.endCol - move.startCol == 2:
-                    self.board[move.endRow][move.endCol + 1] = self.board[move.endRow][move.endCol - 1]
-                    self.board[move.endRow][move.endCol - 1] = "--"
-                elif (move.endCol - move.startCol == -2):
-                    self.board[move.endRow][move.endCol - 2] = self.board[move.endRow][move.endCol + 1]
-                    self.board[move.endRow][move.endCol + 1] = "--"
-            self.checkmate = False
-            self.stalemate = False
+            self.moveLog.pop()
+            self.undoMoveCode()
+
+    """
+    makeMoveCode() and undoMoveCode() are what the search uses, they work on
+    packed moves and don't touch moveLog, so every makeMoveCode() has to be
+    taken back by its own undoMoveCode(). the state they can't work out from
+    the move goes on undoStack as one int, so a make/undo pair builds no objects
+    """
+
+    def makeMoveCode(self, move):
+        board = self.board
+        startSq = move & 63
+        endSq = move >> 6 & 63
+        startRow, startCol = startSq >> 3, startSq & 7
+        endRow, endCol = endSq >> 3, endSq & 7
+        flag = move >> 12 & 3
+        pieceMoved = PIECE_NAMES[move >> 22 & 15]
+        pieceCaptured = PIECE_NAMES[move >> 18 & 15]
+        promotion = move >> 14 & 15
+        placedPiece = PIECE_NAMES[promotion] if promotion else pieceMoved
+        key = self.zobristKey ^ zobristPieces[pieceMoved][startSq] ^ zobristPieces[placedPiece][endSq]
+        rights = self.currentCastlingRights
+        state = rights | self.halfmoveClock << 8
+        if self.enpassantPossible != ():
+            key ^= zobristEnpassant[self.enpassantPossible[1]]
+            state |= self.enpassantPossible[1] + 1 << 4
+        if self.undoCount == len(self.undoStack):
+            self.undoStack.extend([0] * len(self.undoStack))
+        self.undoStack[self.undoCount] = state
+        self.undoCount += 1
+        board[startRow][startCol] = "--"
+        board[endRow][endCol] = placedPiece
+        self.moveCodeLog.append(move)
+        if pieceMoved[1] == "p" or pieceCaptured != "--":
+            self.halfmoveClock = 0
+        else:
+            self.halfmoveClock += 1
+        self.whiteToMove = not self.whiteToMove
+        if pieceMoved == "wK":
+            self.whiteKingLocation = SQUARE_COORDS[endSq]
+        elif pieceMoved == "bK":
+            self.blackKingLocation = SQUARE_COORDS[endSq]
+        if flag == ENPASSANT_FLAG:
+            board[startRow][endCol] = "--"
+            key ^= zobristPieces[pieceCaptured][startRow * 8 + endCol]
+        elif pieceCaptured != "--":
+            key ^= zobristPieces[pieceCaptured][endSq]
+        if pieceCaptured != "--":
+            self.pieceCount -= 1
+        if pieceMoved[1] == "p" and abs(startRow - endRow) == 2:
+            self.enpassantPossible = ENPASSANT_SQUARES[self.whiteToMove][startCol]
+            key ^= zobristEnpassant[startCol]
+        else:
+            self.enpassantPossible = ()
+        if flag == CASTLE_FLAG:
+            if endCol - startCol == 2:
+                rook = board[endRow][endCol + 1]
+                board[endRow][endCol - 1] = rook
+                board[endRow][endCol + 1] = "--"
+                key ^= zobristPieces[rook][endSq + 1] ^ zobristPieces[rook][endSq - 1]
+            else:
+                rook = board[endRow][endCol - 2]
+                board[endRow][endCol + 1] = rook
+                board[endRow][endCol - 2] = "--"
+                key ^= zobristPieces[rook][endSq - 2] ^ zobristPieces[rook][endSq + 1]
+        newRights = rights & CASTLING_RIGHTS_KEPT[startSq] & CASTLING_RIGHTS_KEPT[endSq]
+        if newRights != rights:
+            self.currentCastlingRights = newRights
+            key ^= zobristCastle[rights] ^ zobristCastle[newRights]
+        self.zobristKey = key ^ zobristBlackToMove
+        self.zobristLog.append(self.zobristKey)
+        self.positionCounts[self.zobristKey] = self.positionCounts.get(self.zobristKey, 0) + 1
+        self.boardScore += scoreDelta(move)
+        if self.bitboards is not None:
+            self.bitboards.applyMove(move)
+
+    def undoMoveCode(self):
+        board = self.board
+        move = self.moveCodeLog.pop()
+        startSq = move & 63
+        endSq = move >> 6 & 63
+        startRow, startCol = startSq >> 3, startSq & 7
+        endRow, endCol = endSq >> 3, endSq & 7
+        flag = move >> 12 & 3
+        pieceMoved = PIECE_NAMES[move >> 22 & 15]
+        pieceCaptured = PIECE_NAMES[move >> 18 & 15]
+        board[startRow][startCol] = pieceMoved
+        board[endRow][endCol] = pieceCaptured
+        self.whiteToMove = not self.whiteToMove
+        if pieceMoved == "wK":
+            self.whiteKingLocation = SQUARE_COORDS[startSq]
+        elif pieceMoved == "bK":
+            self.blackKingLocation = SQUARE_COORDS[startSq]
+        if flag == ENPASSANT_FLAG:
+            board[endRow][endCol] = "--"
+            board[startRow][endCol] = pieceCaptured
+        self.popUndoState()
+        if flag == CASTLE_FLAG:
+            if endCol - startCol == 2:
+                board[endRow][endCol + 1] = board[endRow][endCol - 1]
+                board[endRow][endCol - 1] = "--"
+            else:
+                board[endRow][endCol - 2] = board[endRow][endCol + 1]
+                board[endRow][endCol + 1] = "--"
+        count = self.positionCounts[self.zobristKey] - 1
+        if count:
+            self.positionCounts[self.zobristKey] = count
+        else:
+            del self.positionCounts[self.zobristKey]
+        self.zobristLog.pop()
+        self.zobristKey = self.zobristLog[-1]
+        self.boardScore -= scoreDelta(move)
+        if pieceCaptured != "--":
+            self.pieceCount += 1
+        if self.bitboards is not None:
+            self.bitboards.applyMove(move)
+        self.checkmate = False
+        self.stalemate = False
+        return move
+
+    """
+    passes the turn without moving anything, for null-move pruning: only the
+    side to move, the en-passant square (a pass throws that chance away) and
+    the zobrist key change; NULL_MOVE goes on moveCodeLog so the moves on the
+    board can still be counted and taken back in order with undoNullMove().
+    a pass isn't a real move, so repetitions and the fifty-move rule only
+    count from the null move on until it's taken back
+    """
+
+    def makeNullMove(self):
+        key = self.zobristKey
+        state = self.currentCastlingRights | self.halfmoveClock << 8
+        if self.enpassantPossible != ():
+            key ^= zobristEnpassant[self.enpassantPossible[1]]
+            state |= self.enpassantPossible[1] + 1 << 4
+            self.enpassantPossible = ()
+        if self.undoCount == len(self.undoStack):
+            self.undoStack.extend([0] * len(self.undoStack))
+        self.undoStack[self.undoCount] = state
+        self.undoCount += 1
+        self.moveCodeLog.append(NULL_MOVE)
+        self.whiteToMove = not self.whiteToMove
+        self.zobristKey = key ^ zobristBlackToMove
+        self.zobristLog.append(self.zobristKey)
+        self.halfmoveClock = 0
+        self.positionCountsLog.append(self.positionCounts)
+        self.positionCounts = {self.zobristKey: 1}
+
+    def undoNullMove(self):
+        self.positionCounts = self.positionCountsLog.pop()
+        self.moveCodeLog.pop()
+        self.whiteToMove = not self.whiteToMove
+        self.popUndoState()
+        self.zobristLog.pop()
+        self.zobristKey = self.zobristLog[-1]
+        self.checkmate = False
+        self.stalemate = False
 
-    def updateCastlRights(self, move):
-        if move.pieceMoved == "wK":
-            self.currentCastlingRights.wks = False
-            self.currentCastlingRights.wqs = False
-        elif move.pieceMoved == "bK":
-            self.currentCastlingRights.bks = False
-            self.currentCastlingRights.bqs = False
-        elif move.pieceMoved == "wR":
-            if move.startRow == 7:
-                if move.startCol == 0:  # whites left rock
-                    self.currentCastlingRights.wqs = False
-                if move.startCol == 7:  # whites right rock
-                    self.currentCastlingRights.wks = False
-        elif move.pieceMoved == "bR":
-            if move.startRow == 0:
-                if move.startCol == 0:  # black left rock
-                    self.currentCastlingRights.bqs = False
-                if move.startCol == 7:  # black right rock
-                    self.currentCastlingRights.bks = False
-        if move.pieceCaptured == "wR":
-            if move.endRow == 7:
-                if move.endCol == 0:
-                    self.currentCastlingRights.wqs = False
-                elif move.endCol == 7:
-                    self.currentCastlingRights.wks = False
-        elif move.pieceCaptured == "bR":
-            if move.endRow == 0:
-                if move.endCol == 0:
-                    self.currentCastlingRights.bqs = False
-                elif move.endCol == 7:
-                    self.currentCastlingRights.bks = False
+    """
+    True when the position on the board was already on it before, which the
+    search scores as a draw (the side that could avoid it would have)
+    """
+
+    def isRepetition(self):
+        return self.positionCounts[self.zobristKey] >= 2
+
+    def isThreefoldRepetition(self):
+        return self.positionCounts[self.zobristKey] >= 3
+
+    def isFiftyMoveDraw(self):
+        return self.halfmoveClock >= 100
+
+    """
+    restores the castling rights, en-passant square and halfmove clock the last
+    move or null move put on undoStack, once whiteToMove is back to its mover
+    """
+
+    def popUndoState(self):
+        self.undoCount -= 1
+        state = self.undoStack[self.undoCount]
+        self.currentCastlingRights = state & 15
+        enpassantFile = state >> 4 & 15
+        self.enpassantPossible = ENPASSANT_SQUARES[self.whiteToMove][enpassantFile - 1] if enpassantFile else ()
+        self.halfmoveClock = state >> 8
+
+    """
+    the Move objects are only built here for the gui and the move log,
+    the search works with getValidMoveCodes() directly
+    """
 
     def getValidMoves(self):
-        tempEnpassantPossible = self.enpassantPossible
-        tempCastleRights = CastleRights(
-            self.currentCastlingRights.wks,
-            self.currentCastlingRights.bks,
-            self.currentCastlingRights.wqs,
-            self.currentCastlingRights.bqs,
-        )
-        moves = self.getAllPossibleMoves()
-        for i in range(len(moves) - 1, -1, -1):
-            self.makeMove(moves[i])
-            self.whiteToMove = not self.whiteToMove
-            if self.inCheck():
-                moves.remove(moves[i])
-            self.whiteToMove = not self.whiteToMove
-            self.undoMove()
+        return [Move.fromCode(move) for move in self.getValidMoveCodes()]
+
+    def getValidMoveCodes(self):
+        inCheck, moves = self.filterLegalMoves(self.getAllPossibleMoves())
         if len(moves) == 0:
-            if self.inCheck():
+            if inCheck:
                 self.checkmate = True
             else:
                 self.stalemate = True
@@ -163,161 +563,448 @@ class GameState:
                 self.whiteKingLocation[0], self.whiteKingLocation[1], moves)
         else:
             self.getCastleMoves(self.blackKingLocation[0], self.blackKingLocation[1], moves)
-        self.enpassantPossible = tempEnpassantPossible
-        self.currentCastlingRights = tempCastleRights
         return moves
 
+    """
+    only the legal captures and promotions, for the quiescence search;
+    unlike getValidMoveCodes() it leaves checkmate and stalemate alone
+    since an empty list here doesn't mean the game is over
+    """
+
+    def getCaptureMoveCodes(self):
+        return self.filterLegalMoves(self.getAllPossibleCaptures())[1]
+
+    """
+    drops the pseudo-legal moves that would leave the own king in check,
+    returns (inCheck, legalMoves)
+    """
+
+    def filterLegalMoves(self, pseudoLegalMoves):
+        pinsAndChecks = self.checkForPinsAndChecks()
+        inCheck, pins, _ = pinsAndChecks
+        isLegalMove = self.isLegalMove
+        if inCheck:
+            return True, [move for move in pseudoLegalMoves if isLegalMove(move, pinsAndChecks)]
+        kingRow, kingCol = self.whiteKingLocation if self.whiteToMove else self.blackKingLocation
+        kingSq = kingRow * 8 + kingCol
+        # out of check only king moves, moves of pinned pieces and en-passant can be illegal
+        return False, [
+            move
+            for move in pseudoLegalMoves
+            if ((move & 63) != kingSq and (move & 63) not in pins and move >> 12 & 3 != ENPASSANT_FLAG)
+            or isLegalMove(move, pinsAndChecks)
+        ]
+
+    """
+    whether a pseudo-legal move keeps the own king out of check, pinsAndChecks is
+    what checkForPinsAndChecks() returned for the position, so a caller can test
+    its moves one at a time and only look at the king once
+    """
+
+    def isLegalMove(self, move, pinsAndChecks):
+        inCheck, pins, checks = pinsAndChecks
+        if self.whiteToMove:
+            kingRow, kingCol = self.whiteKingLocation
+            enemyColor = "b"
+        else:
+            kingRow, kingCol = self.blackKingLocation
+            enemyColor = "w"
+        startSq = move & 63
+        endSq = move >> 6 & 63
+        if startSq == kingRow * 8 + kingCol:
+            # lift the king off the board so it doesn't block a ray through itself
+            if self.bitboards is not None:
+                occupied = self.bitboards.occupied ^ 1 << startSq
+                return not self.bitboards.isSquareAttacked(endSq, enemyColor, occupied)
+            king = self.board[kingRow][kingCol]
+            self.board[kingRow][kingCol] = "--"
+            illegal = self.isSquareAttacked(endSq >> 3, endSq & 7, enemyColor)
+            self.board[kingRow][kingCol] = king
+            return not illegal
+        if move >> 12 & 3 == ENPASSANT_FLAG:
+            # en-passant can take two pieces off the same rank at once,
+            # so it's still checked by playing it
+            self.makeMoveCode(move)
+            self.whiteToMove = not self.whiteToMove
+            illegal = self.inCheck()
+            self.whiteToMove = not self.whiteToMove
+            self.undoMoveCode()
+            return not illegal
+        if len(checks) > 1:  # double check, only the king can move
+            return False
+        pin = pins.get(startSq)
+        if pin is not None:
+            # a pinned piece can only slide along the line to its own king
+            dRow = (endSq >> 3) - kingRow
+            dCol = (endSq & 7) - kingCol
+            if dRow * pin[1] != dCol * pin[0] or dRow * pin[0] + dCol * pin[1] <= 0:
+                return False
+        return not inCheck or endSq in checks[0]
+
+    """
+    whether a packed move from somewhere else (the transposition table, a killer
+    of a sibling position) can be played here as far as the pieces go; the move
+    was legal in some position, so only what can have changed since is tested
+    and isLegalMove() still has to look at the king
+    """
+
+    def isPseudoLegal(self, move):
+        board = self.board
+        startSq = move & 63
+        endSq = move >> 6 & 63
+        startRow, startCol = startSq >> 3, startSq & 7
+        endRow = endSq >> 3
+        pieceMoved = PIECE_NAMES[move >> 22 & 15]
+        if board[startRow][startCol] != pieceMoved or (pieceMoved[0] == "w") != self.whiteToMove:
+            return False
+        flag = move >> 12 & 3
+        if flag == CASTLE_FLAG:
+            castleMoves = []
+            self.getCastleMoves(startRow, startCol, castleMoves)
+            return move in castleMoves
+        if flag == ENPASSANT_FLAG:
+            return self.enpassantPossible == SQUARE_COORDS[endSq]
+        if board[endRow][endSq & 7] != PIECE_NAMES[move >> 18 & 15]:
+            return False
+        pieceType = pieceMoved[1]
+        if pieceType == "p":
+            return abs(endRow - startRow) != 2 or board[(startRow + endRow) // 2][startCol] == "--"
+        if pieceType in "BRQ":
+            endCol = endSq & 7
+            step = ((endRow > startRow) - (endRow < startRow)) * 8 + (endCol > startCol) - (endCol < startCol)
+            sq = startSq + step
+            while sq != endSq:
+                if board[sq >> 3][sq & 7] != "--":
+                    return False
+                sq += step
+        return True
+
     def inCheck(self):
         if self.whiteToMove:
             return self.squareUnderAttack(self.whiteKingLocation[0], self.whiteKingLocation[1])
         else:
             return self.squareUnderAttack(self.blackKingLocation[0], self.blackKingLocation[1])
 
+    """
+    looks outward from the king of the side to move once and returns
+    (inCheck, pins, checks):
+     - pins maps the square of every pinned piece to the direction from the king to it
+     - checks holds for every checking piece the set of squares that stop that check,
+       which is the checker itself plus every square between it and the king
+    """
+
+    def checkForPinsAndChecks(self):
+        pins = {}
+        checks = []
+        if self.whiteToMove:
+            enemyColor, allyColor = "b", "w"
+            startRow, startCol = self.whiteKingLocation
+        else:
+            enemyColor, allyColor = "w", "b"
+            startRow, startCol = self.blackKingLocation
+        board = self.board
+        # first 4 are the straight lines, last 4 are the diagonals
+        for j, ray in enumerate(RAYS[startRow * 8 + startCol]):
+            possiblePin = None
+            raySquares = []
+            for endRow, endCol, endSq in ray:
+                endPiece = board[endRow][endCol]
+                raySquares.append(endSq)
+                if endPiece == "--":
+                    continue
+                if endPiece[0] == allyColor:
+                    if possiblePin is None:
+                        possiblePin = endSq
+                        continue
+                    break
+                pieceType = endPiece[1]
+                if (
+                    (j <= 3 and pieceType == "R")
+                    or (j >= 4 and pieceType == "B")
+                    or pieceType == "Q"
+                ):
+                    if possiblePin is None:
+                        checks.append(set(raySquares))
+                    else:
+                        pins[possiblePin] = KING_MOVES[j]
+                break
+        enemyKnight = enemyColor + "N"
+        for endRow, endCol, endSq in KNIGHT_TARGETS[startRow * 8 + startCol]:
+            if board[endRow][endCol] == enemyKnight:
+                checks.append({endSq})
+        # enemy pawns capture towards our side of the board, so they stand where our pawn would capture
+        enemyPawn = enemyColor + "p"
+        for endRow, endCol, endSq in PAWN_TARGETS[allyColor][startRow * 8 + startCol]:
+            if board[endRow][endCol] == enemyPawn:
+                checks.append({endSq})
+        return len(checks) > 0, pins, checks
+
     def squareUnderAttack(self, r, c):
-        self.whiteToMove = not self.whiteToMove
-        oppMoves = self.getAllPossibleMoves()
-        self.whiteToMove = not self.whiteToMove 
-        for move in oppMoves:
-            if move.endRow == r and move.endCol == c: 
+        return self.isSquareAttacked(r, c, "b" if self.whiteToMove else "w")
+
+    """
+    looks outward from the square instead of generating all the moves of the
+    other side: knight and king jumps, the two pawn diagonals and the 8 rays
+    up to their first blocker, it returns as soon as one attacker is found
+    """
+
+    def isSquareAttacked(self, r, c, color):
+        if self.bitboards is not None:
+            return self.bitboards.isSquareAttacked(r * 8 + c, color)
+        board = self.board
+        sq = r * 8 + c
+        # a pawn of color attacks the square from where a pawn of the other color on it would capture
+        pawn = color + "p"
+        for row, col, _ in PAWN_TARGETS["b" if color == "w" else "w"][sq]:
+            if board[row][col] == pawn:
                 return True
-        return False 
+        knight = color + "N"
+        for row, col, _ in KNIGHT_TARGETS[sq]:
+            if board[row][col] == knight:
+                return True
+        king = color + "K"
+        for row, col, _ in KING_TARGETS[sq]:
+            if board[row][col] == king:
+                return True
+        queen = color + "Q"
+        rook = color + "R"
+        for ray in ROOK_RAYS[sq]:
+            for row, col, _ in ray:
+                piece = board[row][col]
+                if piece != "--":
+                    if piece == rook or piece == queen:
+                        return True
+                    break
+        bishop = color + "B"
+        for ray in BISHOP_RAYS[sq]:
+            for row, col, _ in ray:
+                piece = board[row][col]
+                if piece != "--":
+                    if piece == bishop or piece == queen:
+                        return True
+                    break
+        return False
+
+    """
+    same walk as isSquareAttacked() but returns the (row, col) of every piece
+    of the given color that attacks the square, used by evaluation and SEE
+    """
+
+    def attackersOf(self, square, color):
+        r, c = square
+        if self.bitboards is not None:
+            return [divmod(sq, 8) for sq in squares(self.bitboards.attackersOf(r * 8 + c, color))]
+        board = self.board
+        sq = r * 8 + c
+        attackers = []
+        for targets, pieceType in (
+            (PAWN_TARGETS["b" if color == "w" else "w"][sq], "p"),
+            (KNIGHT_TARGETS[sq], "N"),
+            (KING_TARGETS[sq], "K"),
+        ):
+            attacker = color + pieceType
+            for row, col, _ in targets:
+                if board[row][col] == attacker:
+                    attackers.append((row, col))
+        for rays, sliders in ((ROOK_RAYS[sq], "RQ"), (BISHOP_RAYS[sq], "BQ")):
+            for ray in rays:
+                for row, col, _ in ray:
+                    piece = board[row][col]
+                    if piece != "--":
+                        if piece[0] == color and piece[1] in sliders:
+                            attackers.append((row, col))
+                        break
+        return attackers
 
     def getAllPossibleMoves(self):
+        if self.bitboards is not None:
+            return self.getBitboardMoves()
         moves = []
-        for r in range(len(self.board)): 
+        for r in range(len(self.board)):
             for c in range(len(self.board[r])):
-                turn = self.board[r][c][0] 
+                turn = self.board[r][c][0]
                 if (turn == "w" and self.whiteToMove) or (turn == "b" and not self.whiteToMove):
                     piece = self.board[r][c][1]
                     self.moveFunctions[piece](r, c, moves)
         return moves
 
+    """
+    the pseudo-legal captures, en-passant and (non capturing) promotions,
+    walks every piece of the side to move only up to its first target
+    """
+
+    def getAllPossibleCaptures(self):
+        if self.bitboards is not None:
+            return self.getBitboardMoves(capturesOnly=True)
+        board = self.board
+        if self.whiteToMove:
+            color, enemyColor, step, lastRow = "w", "b", -1, 0
+        else:
+            color, enemyColor, step, lastRow = "b", "w", 1, 7
+        enPassantCapture = PIECE_CODES[enemyColor + "p"] << 18 | ENPASSANT_FLAG << 12
+        moves = []
+        for r in range(8):
+            for c in range(8):
+                piece = board[r][c]
+                if piece[0] != color:
+                    continue
+                pieceType = piece[1]
+                base = PIECE_CODES[piece] << 22 | r * 8 + c
+                if pieceType == "p":
+                    endRow = r + step
+                    promotion = PIECE_CODES[color + "Q"] << 14 if endRow == lastRow else 0
+                    if promotion and board[endRow][c] == "--":
+                        moves.append(base | (endRow * 8 + c) << 6 | promotion)
+                    for endRow, endCol, endSq in PAWN_TARGETS[color][r * 8 + c]:
+                        endPiece = board[endRow][endCol]
+                        if endPiece[0] == enemyColor:
+                            moves.append(base | endSq << 6 | PIECE_CODES[endPiece] << 18 | promotion)
+                        elif (endRow, endCol) == self.enpassantPossible:
+                            moves.append(base | endSq << 6 | enPassantCapture)
+                elif pieceType == "N" or pieceType == "K":
+                    for endRow, endCol, endSq in (KNIGHT_TARGETS if pieceType == "N" else KING_TARGETS)[r * 8 + c]:
+                        endPiece = board[endRow][endCol]
+                        if endPiece[0] == enemyColor:
+                            moves.append(base | endSq << 6 | PIECE_CODES[endPiece] << 18)
+                else:
+                    if pieceType == "R":
+                        rays = ROOK_RAYS[r * 8 + c]
+                    elif pieceType == "B":
+                        rays = BISHOP_RAYS[r * 8 + c]
+                    else:
+                        rays = RAYS[r * 8 + c]
+                    for ray in rays:
+                        for endRow, endCol, endSq in ray:
+                            endPiece = board[endRow][endCol]
+                            if endPiece != "--":
+                                if endPiece[0] == enemyColor:
+                                    moves.append(base | endSq << 6 | PIECE_CODES[endPiece] << 18)
+                                break
+        return moves
+
+    """
+    the same pseudo-legal moves as the per-piece functions below but
+    the targets of every piece come out of the bitboards as one mask,
+    with capturesOnly only what getAllPossibleCaptures() returns
+    """
+
+    def getBitboardMoves(self, capturesOnly=False):
+        moves = []
+        board = self.board
+        pieces = self.bitboards.pieces
+        occupied = self.bitboards.occupied
+        if self.whiteToMove:
+            color, enemyColor, step, pawnStartRow, lastRow = "w", "b", -8, 6, 0
+        else:
+            color, enemyColor, step, pawnStartRow, lastRow = "b", "w", 8, 1, 7
+        empty = ~occupied & FULL
+        enemies = self.bitboards.colors[enemyColor]
+        targets = enemies if capturesOnly else ~self.bitboards.colors[color] & FULL
+        epSquare = -1
+        if self.enpassantPossible != ():
+            epSquare = self.enpassantPossible[0] * 8 + self.enpassantPossible[1]
+        pawnCode = PIECE_CODES[color + "p"]
+        promotionCodes = QUEEN_PROMOTION_CODES[color] if capturesOnly else PROMOTION_CODES[color]
+        for sq in squares(pieces[color + "p"]):
+            base = pawnCode << 22 | sq
+            endSq = sq + step
+            promotions = promotionCodes if endSq >> 3 == lastRow else NO_PROMOTION
+            if empty >> endSq & 1 and (promotions is not NO_PROMOTION or not capturesOnly):
+                moves.extend(base | endSq << 6 | promotion for promotion in promotions)
+                if not capturesOnly and sq >> 3 == pawnStartRow and empty >> (endSq + step) & 1:
+                    moves.append(base | (endSq + step) << 6)
+            attacks = PAWN_ATTACKS[color][sq]
+            for endSq in squares(attacks & enemies):
+                captured = PIECE_CODES[board[endSq >> 3][endSq & 7]]
+                moves.extend(base | endSq << 6 | captured << 18 | promotion for promotion in promotions)
+            if epSquare >= 0 and attacks >> epSquare & 1:
+                moves.append(
+                    base | epSquare << 6 | PIECE_CODES[enemyColor + "p"] << 18 | ENPASSANT_FLAG << 12
+                )
+        for pieceType in "NBRQK":
+            piece = color + pieceType
+            pieceCode = PIECE_CODES[piece]
+            for sq in squares(pieces[piece]):
+                if pieceType == "N":
+                    attacks = KNIGHT_ATTACKS[sq]
+                elif pieceType == "B":
+                    attacks = bishopAttacks(occupied, sq)
+                elif pieceType == "R":
+                    attacks = rookAttacks(occupied, sq)
+                elif pieceType == "Q":
+                    attacks = bishopAttacks(occupied, sq) | rookAttacks(occupied, sq)
+                else:
+                    attacks = KING_ATTACKS[sq]
+                base = pieceCode << 22 | sq
+                for endSq in squares(attacks & targets):
+                    moves.append(base | endSq << 6 | PIECE_CODES[board[endSq >> 3][endSq & 7]] << 18)
+        return moves
+
     def getPawnMove(self, r, c, moves):
+        board = self.board
         if self.whiteToMove:
-            if self.board[r - 1][c] == "--":
-                moves.append(Move((r, c), (r - 1, c), self.board))
-                if r == 6 and self.board[r - 2][c] == "--":
-                    moves.append(Move((r, c), (r - 2, c), self.board))
-            if c - 1 >= 0:
-                if (self.board[r - 1][c - 1][0] == "b"): 
-                    moves.append(Move((r, c), (r - 1, c - 1), self.board))
-                elif (r - 1, c - 1) == self.enpassantPossible:
-                    moves.append(Move((r, c), (r - 1, c - 1), self.board, isEnpassantMove=True))
-            if c + 1 <= 7: 
-                if (self.board[r - 1][c + 1][0] == "b"):
-                    moves.append(Move((r, c), (r - 1, c + 1), self.board))
-                elif (r - 1, c + 1) == self.enpassantPossible:
-                    moves.append(Move((r, c), (r - 1, c + 1), self.board, isEnpassantMove=True))
-
-        else: 
-            if self.board[r + 1][c] == "--":
-                moves.append(Move((r, c), (r + 1, c), self.board))
-                if r == 1 and self.board[r + 2][c] == "--":
-                    moves.append(Move((r, c), (r + 2, c), self.board))
-            if c - 1 >= 0: 
-                if (self.board[r + 1][c - 1][0] == "w"): 
-                    moves.append(Move((r, c), (r + 1, c - 1), self.board))
-                elif (r + 1, c - 1) == self.enpassantPossible:
-                    moves.append(Move((r, c), (r + 1, c - 1), self.board, isEnpassantMove=True))
-            if c + 1 <= 7:  
-                if (self.board[r + 1][c + 1][0] == "w"):  
-                    moves.append(Move((r, c), (r + 1, c + 1), self.board))
-                elif (r + 1, c + 1) == self.enpassantPossible:
-                    moves.append(Move((r, c), (r + 1, c + 1), self.board, isEnpassantMove=True))
+            color, enemyColor, step, startRow, promotionRow = "w", "b", -1, 6, 1
+        else:
+            color, enemyColor, step, startRow, promotionRow = "b", "w", 1, 1, 6
+        sq = r * 8 + c
+        base = PIECE_CODES[color + "p"] << 22 | sq
+        promotions = PROMOTION_CODES[color] if r == promotionRow else NO_PROMOTION
+        if board[r + step][c] == "--":
+            moves.extend(base | sq + step * 8 << 6 | promotion for promotion in promotions)
+            if r == startRow and board[r + 2 * step][c] == "--":
+                moves.append(base | sq + step * 16 << 6)
+        for endRow, endCol, endSq in PAWN_TARGETS[color][sq]:
+            endPiece = board[endRow][endCol]
+            if endPiece[0] == enemyColor:
+                capture = base | endSq << 6 | PIECE_CODES[endPiece] << 18
+                moves.extend(capture | promotion for promotion in promotions)
+            elif (endRow, endCol) == self.enpassantPossible:
+                moves.append(base | endSq << 6 | PIECE_CODES[enemyColor + "p"] << 18 | ENPASSANT_FLAG << 12)
 
     def getKnightMove(self, r, c, moves):
-        knightMoves = (
-            (-1, -2),
-            (-1, 2),
-            (-2, -1),
-            (-2, 1),
-            (1, -2),
-            (1, 2),
-            (2, -1),
-            (2, 1),
-        )
-        allyColor = "w" if self.whiteToMove else "b"
-        for m in knightMoves:
-            endRow = r + m[0]
-            endCol = c + m[1]
-            if 0 <= endRow < 8 and 0 <= endCol < 8:
-                endPiece = self.board[endRow][endCol]
-                if endPiece[0] != allyColor:
-                    moves.append(Move((r, c), (endRow, endCol), self.board))
+        self.getJumpMoves(r, c, moves, KNIGHT_TARGETS[r * 8 + c])
 
     def getBishopMove(self, r, c, moves):
-        # (row, col) representation for the 4 diaganol moves
-        directions = ((-1, -1), (-1, 1), (1, -1), (1, 1))
-        enemyColor = "b" if self.whiteToMove else "w"
-        for d in directions:
-            for i in range(1, 8):
-                endRow = r + d[0] * i
-                endCol = c + d[1] * i
-                if (0 <= endRow < 8 and 0 <= endCol < 8):
-                    endPiece = self.board[endRow][endCol]
-                    if endPiece == "--":
-                        moves.append(Move((r, c), (endRow, endCol), self.board))
-                    elif endPiece[0] == enemyColor:
-                        moves.append(Move((r, c), (endRow, endCol), self.board))
-                        break
-                    else:
-                        break
-                else: 
-                    break
+        self.getSlidingMoves(r, c, moves, BISHOP_RAYS[r * 8 + c])
 
     def getRockMove(self, r, c, moves):
-        directions = ((-1, 0), (0, -1), (1, 0), (0, 1))
-        enemyColor = "b" if self.whiteToMove else "w"
-        for d in directions:
-            for i in range(1, 8):
-                endRow = r + d[0] * i
-                endCol = c + d[1] * i
-                if (0 <= endRow < 8 and 0 <= endCol < 8):
-                    endPiece = self.board[endRow][endCol]
-                    if endPiece == "--":
-                        moves.append(Move((r, c), (endRow, endCol), self.board))
-                    elif endPiece[0] == enemyColor:
-                        moves.append(Move((r, c), (endRow, endCol), self.board))
-                        break
-                    else:
-                        break
-                else: 
-                    break
+        self.getSlidingMoves(r, c, moves, ROOK_RAYS[r * 8 + c])
 
     def getQueenMove(self, r, c, moves):
-        self.getBishopMove(r, c, moves)
-        self.getRockMove(r, c, moves)
+        self.getSlidingMoves(r, c, moves, RAYS[r * 8 + c])
 
     def getKingMove(self, r, c, moves):
-        kingMoves = (
-            (-1, 0),
-            (0, -1),
-            (1, 0),
-            (0, 1),  
-            (-1, -1),
-            (-1, 1),
-            (1, -1),
-            (1, 1),
-        )
+        self.getJumpMoves(r, c, moves, KING_TARGETS[r * 8 + c])
+
+    def getJumpMoves(self, r, c, moves, targets):
+        board = self.board
         allyColor = "w" if self.whiteToMove else "b"
-        for i in range(8):
-            endRow = r + kingMoves[i][0]
-            endCol = c + kingMoves[i][1]
-            if 0 <= endRow < 8 and 0 <= endCol < 8:
-                endPiece = self.board[endRow][endCol]
-                if endPiece[0] != allyColor:
-                    moves.append(Move((r, c), (endRow, endCol), self.board))
+        base = PIECE_CODES[board[r][c]] << 22 | r * 8 + c
+        for endRow, endCol, endSq in targets:
+            endPiece = board[endRow][endCol]
+            if endPiece[0] != allyColor:
+                moves.append(base | endSq << 6 | PIECE_CODES[endPiece] << 18)
+
+    def getSlidingMoves(self, r, c, moves, rays):
+        board = self.board
+        enemyColor = "b" if self.whiteToMove else "w"
+        base = PIECE_CODES[board[r][c]] << 22 | r * 8 + c
+        for ray in rays:
+            for endRow, endCol, endSq in ray:
+                endPiece = board[endRow][endCol]
+                if endPiece == "--":
+                    moves.append(base | endSq << 6)
+                else:
+                    if endPiece[0] == enemyColor:
+                        moves.append(base | endSq << 6 | PIECE_CODES[endPiece] << 18)
+                    break
 
     def getCastleMoves(self, r, c, moves):
         if self.squareUnderAttack(r, c):
             return
-        if (self.whiteToMove and self.currentCastlingRights.wks) or (
-            not self.whiteToMove and self.currentCastlingRights.bks
-        ):
+        if self.currentCastlingRights & (WHITE_KING_SIDE if self.whiteToMove else BLACK_KING_SIDE):
             self.getKingSideCastleMoves(r, c, moves)
-        if (self.whiteToMove and self.currentCastlingRights.wqs) or (
-            not self.whiteToMove and self.currentCastlingRights.bqs
-        ):
+        if self.currentCastlingRights & (WHITE_QUEEN_SIDE if self.whiteToMove else BLACK_QUEEN_SIDE):
             self.getQueenSideCastleMoves(r, c, moves)
 
     def getKingSideCastleMoves(self, r, c, moves):
@@ -325,7 +1012,9 @@ class GameState:
             if not self.squareUnderAttack(r, c + 1) and not self.squareUnderAttack(
                 r, c + 2
             ):
-                moves.append(Move((r, c), (r, c + 2), self.board, isCastleMove=True))
+                moves.append(
+                    encodeMove(r * 8 + c, r * 8 + c + 2, PIECE_CODES[self.board[r][c]], flag=CASTLE_FLAG)
+                )
 
     def getQueenSideCastleMoves(self, r, c, moves):
         if (
@@ -334,19 +1023,13 @@ class GameState:
             and self.board[r][c - 3] == "--"
         ):
             if not self.squareUnderAttack(r, c - 1) and not self.squareUnderAttack(r, c - 2):
-                moves.append(Move((r, c), (r, c - 2), self.board, isCastleMove=True))
-
-
-class CastleRights:
-    def __init__(self, wks, bks, wqs, bqs):
-        self.wks = wks
-        self.bks = bks
-        self.wqs = wqs
-        self.bqs = bqs
+                moves.append(
+                    encodeMove(r * 8 + c, r * 8 + c - 2, PIECE_CODES[self.board[r][c]], flag=CASTLE_FLAG)
+                )
 
 
 class Move:
-    ranksToRows = {"1": 7, "2": 6, "3": 5, "4": 4, "5": 3, "6": 2, "7": 1, "0": 0}
+    ranksToRows = {"1": 7, "2": 6, "3": 5, "4": 4, "5": 3, "6": 2, "7": 1, "8": 0}
 
     rowsToRanks = {v: k for k, v in ranksToRows.items()}
 
@@ -354,8 +1037,24 @@ class Move:
 
     colsToFiles = {v: k for k, v in fileToCols.items()}
 
+    # no per-instance __dict__, a Move is only a readable view of a packed move
+    __slots__ = (
+        "startRow",
+        "startCol",
+        "endRow",
+        "endCol",
+        "pieceMoved",
+        "pieceCaptured",
+        "isEnpassantMove",
+        "isPawnPromotion",
+        "isCastleMove",
+        "isCapture",
+        "moveID",
+        "code",
+    )
+
     def __init__(
-        self, startSq, endSq, board, isEnpassantMove=False, isCastleMove=False
+        self, startSq, endSq, board, isEnpassantMove=False, isCastleMove=False, promotionChoice="Q"
     ):
         self.startRow, self.startCol = startSq
         self.endRow, self.endCol = endSq
@@ -369,9 +1068,50 @@ class Move:
         )
         self.isCastleMove = isCastleMove
         self.isCapture = self.pieceCaptured != "--"
+        self.code = encodeMove(
+            self.startRow * 8 + self.startCol,
+            self.endRow * 8 + self.endCol,
+            PIECE_CODES[self.pieceMoved],
+            PIECE_CODES[self.pieceCaptured],
+            ENPASSANT_FLAG if isEnpassantMove else CASTLE_FLAG if isCastleMove else 0,
+            PIECE_CODES[self.pieceMoved[0] + promotionChoice] if self.isPawnPromotion else 0,
+        )
+        # the promotion piece is part of the id so the 4 promotions of a pawn are different moves
         self.moveID = (
-            self.startRow * 1000 + self.startCol * 100 + self.endRow * 10 + self.endCol
+            (self.code >> 14 & 15) * 10000
+            + self.startRow * 1000
+            + self.startCol * 100
+            + self.endRow * 10
+            + self.endCol
+        )
+
+    """
+    builds the Move of a packed move without looking at the board
+    """
+
+    @classmethod
+    def fromCode(cls, code):
+        move = cls.__new__(cls)
+        startSq = code & 63
+        endSq = code >> 6 & 63
+        flag = code >> 12 & 3
+        move.startRow, move.startCol = startSq >> 3, startSq & 7
+        move.endRow, move.endCol = endSq >> 3, endSq & 7
+        move.pieceMoved = PIECE_NAMES[code >> 22 & 15]
+        move.pieceCaptured = PIECE_NAMES[code >> 18 & 15]
+        move.isEnpassantMove = flag == ENPASSANT_FLAG
+        move.isCastleMove = flag == CASTLE_FLAG
+        move.isPawnPromotion = code >> 14 & 15 != 0
+        move.isCapture = move.pieceCaptured != "--"
+        move.moveID = (
+            (code >> 14 & 15) * 10000
+            + move.startRow * 1000
+            + move.startCol * 100
+            + move.endRow * 10
+            + move.endCol
         )
+        move.code = code
+        return move
 
     def __eq__(self, other):
         if isinstance(other, Move):
@@ -380,9 +1120,13 @@ class Move:
 
     def getChessNotation(self):
         # this can be modified to be a more real chess notation
-        return self.getRankFile(self.startRow, self.startCol) + self.getRankFile(
+        notation = self.getRankFile(self.startRow, self.startCol) + self.getRankFile(
             self.endRow, self.endCol
         )
+        if self.isPawnPromotion:
+            # the promotion piece in lower case, like e7e8q
+            notation += PIECE_NAMES[self.code >> 14 & 15][1].lower()
+        return notation
 
     def getRankFile(self, r, c):
         return self.colsToFiles[c] + self.rowsToRanks[r]
@@ -392,11 +1136,13 @@ class Move:
             return "O-O" if self.endCol == 6 else "O-O-O"
         endSquare = self.getRankFile(self.endRow, self.endCol)
         if self.pieceMoved[1] == "p":
+            if self.isPawnPromotion:
+                endSquare += "=" + PIECE_NAMES[self.code >> 14 & 15][1]
             if self.isCapture:
                 return self.colsToFiles[self.startCol] + "x" + endSquare
             else:
                 return endSquare
-        # TODO add promotion, + sign for check, # for checkmate and two pieces can move to same square
+        # TODO add + sign for check, # for checkmate and two pieces can move to same square
         # other piece moves, captures
         moveString = self.pieceMoved[1]
         if self.isCapture:
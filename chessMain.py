@@ -3,14 +3,14 @@ import time
 
 sys.path.append(".")
 
+from aiWorker import AIWorker
 from chessEngine import GameState, Move
-from smartMoveFinder import findMoveNegaMaxAlphaBeta, scoreBoard, findBestMoveMinMax, findRandomMoves
+from smartMoveFinder import scoreBoard, findRandomMoves
 
 from chessEngine import *
 from smartMoveFinder import *
 import pygame as p
 import os
-from multiprocessing import Process, Queue
 
 # our current path information:
 current_path = os.path.dirname(__file__) 
@@ -22,6 +22,9 @@ MOVE_LOG_PANEL_HEIGHT = BOARD_HEIGHT
 DIMENSION = 8
 SQ_SIZE = BOARD_HEIGHT // DIMENSION
 MAX_FPS = 15
+# with nothing to redraw and no AI thinking the loop waits for the next event,
+# waking up at least every this many milliseconds
+IDLE_TIMEOUT = 500
 IMAGES = {}
 
 def loadImages():
@@ -37,6 +40,7 @@ def main():
     clock = p.time.Clock()
     screen.fill(p.Color("white"))
     moveLogFont = p.font.SysFont("Arail", 20, False, False)
+    renderer = Renderer(screen, moveLogFont)
     gs = GameState()
     validMoves = gs.getValidMoves()
     moveMade = False
@@ -49,13 +53,16 @@ def main():
     playerOne = True  # for white side
     playerTwo = True  # for black side
     AIThinking = False
-    moveFinderProcess = None
+    # one search process for the whole game, it's told every move instead of getting the GameState
+    aiWorker = AIWorker()
     moveUndone = False
     while running:
         humanTurn = (gs.whiteToMove and playerOne) or (not gs.whiteToMove and playerTwo)
         for e in p.event.get():
             if e.type == p.QUIT:
                 running = False
+            elif e.type == p.VIDEOEXPOSE:
+                renderer.invalidate()
             elif e.type == p.MOUSEBUTTONDOWN:
                 if not gameOver:
                     location = p.mouse.get_pos() 
@@ -72,6 +79,7 @@ def main():
                         for i in range(len(validMoves)):
                             if move == validMoves[i]:
                                 gs.makeMove(validMoves[i])
+                                aiWorker.pushMove(validMoves[i])
                                 moveMade = True
                                 animate = True
                                 sqSelected = () 
@@ -80,14 +88,16 @@ def main():
                             playerClicks = [sqSelected]
             elif e.type == p.KEYDOWN:
                 if e.key == p.K_z: 
-                    gs.undoMove()
+                    if len(gs.moveLog) != 0:
+                        gs.undoMove()
+                        aiWorker.popMove()
                     sqSelected = ()
                     playerClicks = []
                     moveMade = True
                     animate = False
                     gameOver = False
                     if AIThinking:
-                        moveFinderProcess.terminate()
+                        aiWorker.cancel()
                         AIThinking = False
                     moveUndone = True
                 if e.key == p.K_r: 
@@ -99,60 +109,165 @@ def main():
                     animate = False
                     gameOver = False
                     running = True
-                    if AIThinking:
-                        moveFinderProcess.terminate()  
-                        AIThinking = False
+                    aiWorker.reset()
+                    AIThinking = False
                     moveUndone = False
         # handle the AI move finder
         if not gameOver and not humanTurn and not moveUndone:
             if not AIThinking:
                 AIThinking = True
                 print("thinking..")
-                returnQueue = Queue() 
-                moveFinderProcess = Process(
-                    target=findBestMoveMinMax,
-                    args=(
-                        gs,
-                        validMoves,
-                        returnQueue,
-                    ),
-                )
-                moveFinderProcess.start()
-                if not moveFinderProcess.is_alive():
-                    AIMove = returnQueue.get()
+                aiWorker.requestMove()
+            else:
+                # checked once a frame, the gui keeps running while the worker thinks
+                AIMove = aiWorker.poll()
+                if AIMove is not None or not aiWorker.thinking:
                     print("done thinking")
                     if AIMove is None:
                         AIMove = findRandomMoves(validMoves)
                     gs.makeMove(AIMove)
+                    aiWorker.pushMove(AIMove)
                     moveMade = True
                     animate = True
                     AIThinking = False
         if moveMade:
             if animate:
-                animateMove(gs.moveLog[-1], screen, gs.board, clock)
+                animateMove(gs.moveLog[-1], screen, gs.board, clock, renderer.background)
+                renderer.invalidate()
             validMoves = gs.getValidMoves()
             moveMade = False
             animate = False
             moveUndone = False
-        drawGameState(screen, gs, validMoves, sqSelected, moveLogFont)
-        if gs.checkmate or gs.stalemate:
+        text = None
+        if gs.checkmate or gs.stalemate or gs.isThreefoldRepetition() or gs.isFiftyMoveDraw():
             gameOver = True
             text = (
-                "Stalemate"
+                ("Black wins by checkmate" if gs.whiteToMove else "White wins by chekmate")
+                if gs.checkmate
+                else "Stalemate"
                 if gs.stalemate
-                else "Black wins by checkmate"
-                if gs.whiteToMove
-                else "White wins by chekmate"
+                else "Draw by threefold repetition"
+                if gs.isThreefoldRepetition()
+                else "Draw by the fifty-move rule"
             )
-            drawEndGameText(screen, text)
-        clock.tick(MAX_FPS)
-        p.display.flip()
+        if renderer.draw(gs, validMoves, sqSelected, text) or AIThinking:
+            clock.tick(MAX_FPS)
+        else:
+            # nothing changed, sleep until the next event instead of drawing the same frame again
+            e = p.event.wait(IDLE_TIMEOUT)
+            if e.type != p.NOEVENT:
+                p.event.post(e)
+    aiWorker.close()
+
+# draws the game in retained mode: the squares are painted once onto a background
+# surface, after that only the squares whose piece or highlight changed are repainted
+# from it and sent to the display with display.update(rects); the move log lives on
+# its own surface where only the lines of new or taken back moves are rendered again,
+# so a long game costs no more per frame than a short one
+class Renderer:
+    def __init__(self, screen, font):
+        self.screen = screen
+        self.font = font
+        self.background = p.Surface((BOARD_WIDTH, BOARD_HEIGHT))
+        drawBoard(self.background)
+        self.selectedSquare = p.Surface((SQ_SIZE, SQ_SIZE))
+        self.selectedSquare.set_alpha(100)
+        self.selectedSquare.fill(p.Color("blue"))
+        self.targetSquare = p.Surface((SQ_SIZE, SQ_SIZE))
+        self.targetSquare.set_alpha(100)
+        self.targetSquare.fill(p.Color("yellow"))
+        self.moveLogRect = p.Rect(BOARD_WIDTH, 0, MOVE_LOG_PANEL_WIDTH, MOVE_LOG_PANEL_HEIGHT)
+        self.moveLogSurface = p.Surface((MOVE_LOG_PANEL_WIDTH, MOVE_LOG_PANEL_HEIGHT))
+        self.invalidate()
 
-def drawGameState(screen, gs, validMoves, sqSelected, moveLogFont):
-    drawBoard(screen)  # draw the squares on the board right :)
-    highlightSquares(screen, gs, validMoves, sqSelected)
-    drawPieces(screen, gs.board)  # just draw the pieces on the top of the board
-    drawMoveLog(screen, gs, moveLogFont)
+    # forgets what's on the display so the next draw() repaints everything,
+    # for when something else drew over it (the move animation, the window manager)
+    def invalidate(self):
+        # (piece, highlight) of every square as it's on the display, None when unknown
+        self.shownSquares = [[None] * DIMENSION for _ in range(DIMENSION)]
+        self.shownText = None
+        # the moves the move log surface shows
+        self.loggedMoves = []
+        self.moveLogSurface.fill(p.Color("black"))
+        self.fullRedraw = True
+
+    # brings the display up to date, returns whether anything had to be drawn
+    def draw(self, gs, validMoves, sqSelected, endText=None):
+        if endText is None and self.shownText is not None:
+            self.invalidate()  # the text covered the middle of the board
+        dirtyRects = self.drawSquares(gs, validMoves, sqSelected)
+        if endText is not None and (dirtyRects or endText != self.shownText):
+            dirtyRects.append(drawEndGameText(self.screen, endText))
+        self.shownText = endText
+        if self.updateMoveLog(gs.moveLog):
+            self.screen.blit(self.moveLogSurface, self.moveLogRect)
+            dirtyRects.append(self.moveLogRect)
+        if self.fullRedraw:
+            self.fullRedraw = False
+            p.display.flip()
+            return True
+        if dirtyRects:
+            p.display.update(dirtyRects)
+        return len(dirtyRects) > 0
+
+    def drawSquares(self, gs, validMoves, sqSelected):
+        highlights = {}
+        if sqSelected != ():
+            r, c = sqSelected
+            if gs.board[r][c][0] == ("w" if gs.whiteToMove else "b"):
+                for move in validMoves:
+                    if move.startRow == r and move.startCol == c:
+                        highlights[(move.endRow, move.endCol)] = self.targetSquare
+                highlights[sqSelected] = self.selectedSquare
+        dirtyRects = []
+        for r in range(DIMENSION):
+            for c in range(DIMENSION):
+                piece = gs.board[r][c]
+                highlight = highlights.get((r, c))
+                if self.shownSquares[r][c] == (piece, highlight):
+                    continue
+                self.shownSquares[r][c] = (piece, highlight)
+                square = p.Rect(c * SQ_SIZE, r * SQ_SIZE, SQ_SIZE, SQ_SIZE)
+                self.screen.blit(self.background, square, square)
+                if highlight is not None:
+                    self.screen.blit(highlight, square)
+                if piece != "--":
+                    self.screen.blit(IMAGES[piece], square)
+                dirtyRects.append(square)
+        return dirtyRects
+
+    # drops the logged moves that aren't in moveLog anymore (undo, reset) and adds the
+    # new ones, only the lines from the first changed move on are rendered again;
+    # returns whether the move log surface changed
+    def updateMoveLog(self, moveLog):
+        logged = self.loggedMoves
+        changed = self.fullRedraw
+        while logged and (len(logged) > len(moveLog) or logged[-1] is not moveLog[len(logged) - 1]):
+            logged.pop()
+            changed = True
+        firstChanged = len(logged)
+        if firstChanged == len(moveLog) and not changed:
+            return False
+        logged.extend(moveLog[firstChanged:])
+        padding = 5
+        lineSpacing = 5
+        movesPerRow = 3
+        pliesPerLine = movesPerRow * 2
+        lineHeight = self.font.get_height() + lineSpacing
+        firstLine = firstChanged // pliesPerLine
+        textY = padding + firstLine * lineHeight
+        self.moveLogSurface.fill(p.Color("black"), p.Rect(0, textY, MOVE_LOG_PANEL_WIDTH, MOVE_LOG_PANEL_HEIGHT))
+        for i in range(firstLine * pliesPerLine, len(logged), pliesPerLine):
+            text = ""
+            for j in range(i, min(i + pliesPerLine, len(logged)), 2):
+                moveString = str(j // 2 + 1) + ". " + str(logged[j]) + " "
+                if j + 1 < len(logged):
+                    moveString += str(logged[j + 1])
+                text += moveString + "  "
+            textObject = self.font.render(text, True, p.Color("white"))
+            self.moveLogSurface.blit(textObject, (padding, textY))
+            textY += lineHeight
+        return True
 
 def drawBoard(screen):
     global colors
@@ -162,19 +277,6 @@ def drawBoard(screen):
             color = colors[(r + c) % 2]
             p.draw.rect(screen, color, p.Rect(c * SQ_SIZE, r * SQ_SIZE, SQ_SIZE, SQ_SIZE))
 
-def highlightSquares(screen, gs, validMoves, sqSelected):
-    if sqSelected != ():
-        r, c = sqSelected
-        if gs.board[r][c][0] == ("w" if gs.whiteToMove else "b"):
-            s = p.Surface((SQ_SIZE, SQ_SIZE))
-            s.set_alpha(100) 
-            s.fill(p.Color("blue"))
-            screen.blit(s, (c * SQ_SIZE, r * SQ_SIZE))
-            s.fill(p.Color("yellow"))
-            for move in validMoves:
-                if (move.startRow == r and move.startCol == c): 
-                    screen.blit(s, (move.endCol * SQ_SIZE, move.endRow * SQ_SIZE))
-
 def drawPieces(screen, board):
     for r in range(DIMENSION):
         for c in range(DIMENSION):
@@ -182,7 +284,7 @@ def drawPieces(screen, board):
             if piece != "--": 
                 screen.blit(IMAGES[piece], p.Rect(c * SQ_SIZE, r * SQ_SIZE, SQ_SIZE, SQ_SIZE))
 
-def animateMove(move, screen, board, clock):
+def animateMove(move, screen, board, clock, background):
     global colors
     dR = move.endRow - move.startRow
     dC = move.endCol - move.startCol
@@ -193,7 +295,7 @@ def animateMove(move, screen, board, clock):
             move.startRow + dR * frame / frameCount,
             move.startCol + dC * frame / frameCount,
         )
-        drawBoard(screen)
+        screen.blit(background, (0, 0))
         drawPieces(screen, board)
         color = colors[(move.endRow + move.endCol) % 2]
         endSquare = p.Rect(
@@ -227,30 +329,7 @@ def drawEndGameText(screen, text):
     screen.blit(textObject, textLocation)
     textObject = font.render(text, 0, p.Color("Black"))
     screen.blit(textObject, textLocation.move(2, 2))
-
-def drawMoveLog(screen, gs, font):
-    moveLogRect = p.Rect(BOARD_WIDTH, 0, MOVE_LOG_PANEL_WIDTH, MOVE_LOG_PANEL_HEIGHT)
-    p.draw.rect(screen, p.Color("black"), moveLogRect)
-    moveLog = gs.moveLog
-    moveTexts = []
-    for i in range(0, len(moveLog), 2):
-        moveString = str(i // 2 + 1) + ". " + str(moveLog[i]) + " "
-        if i + 1 < len(moveLog):
-            moveString += str(moveLog[i + 1])
-        moveTexts.append(moveString)
-    padding = 5
-    textY = padding
-    lineSpacing = 5
-    movesPerRow = 3
-    for i in range(0, len(moveTexts), movesPerRow):
-        text = ""
-        for j in range(movesPerRow):
-            if i + j < len(moveTexts):
-                text += moveTexts[i + j] + "  "
-        textObject = font.render(text, True, p.Color("white"))
-        textLocation = moveLogRect.move(padding, textY)
-        screen.blit(textObject, textLocation)
-        textY += textObject.get_height() + lineSpacing
+    return p.Rect(textLocation.topleft, (textObject.get_width() + 2, textObject.get_height() + 2))
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,136 @@
+"""
+the evaluation knowledge of the engine: what every piece is worth and which
+squares each piece prefers, plus the same numbers pre-scaled into flat
+integer tables so GameState can keep the score up to date move by move
+"""
+
+from moveEncoding import PIECE_NAMES
+
+# assign the king any value which means you can't really lose
+# your king as it would be a checkmate before that happened
+pieceScore = {"K": 0, "Q": 10, "R": 5, "B": 3, "N": 3, "p": 1}
+
+# this is just a way to give some squares some prefrence than other when moving the each piece
+knightScores = [
+    [1, 1, 1, 1, 1, 1, 1, 1],
+    [1, 2, 2, 2, 2, 2, 2, 1],
+    [1, 2, 3, 3, 3, 3, 2, 1],
+    [1, 2, 3, 4, 4, 3, 2, 1],
+    [1, 2, 3, 4, 4, 3, 2, 1],
+    [1, 2, 3, 3, 3, 3, 2, 1],
+    [1, 2, 2, 2, 2, 2, 2, 1],
+    [1, 1, 1, 1, 1, 1, 1, 1],
+]
+
+bishopScores = [
+    [4, 3, 2, 1, 1, 2, 3, 4],
+    [3, 4, 3, 2, 2, 3, 4, 3],
+    [2, 3, 4, 3, 3, 4, 3, 2],
+    [1, 2, 3, 4, 4, 3, 2, 1],
+    [1, 2, 3, 4, 4, 3, 2, 1],
+    [2, 3, 4, 3, 3, 4, 3, 2],
+    [3, 4, 3, 2, 2, 3, 4, 3],
+    [4, 3, 2, 1, 1, 2, 3, 4],
+]
+
+queenScores = [
+    [1, 1, 1, 3, 1, 1, 1, 1],
+    [1, 2, 3, 3, 3, 1, 1, 1],
+    [1, 4, 3, 3, 3, 4, 2, 1],
+    [1, 2, 3, 3, 3, 2, 2, 1],
+    [1, 2, 3, 3, 3, 2, 2, 1],
+    [1, 4, 3, 3, 3, 4, 2, 1],
+    [1, 1, 2, 3, 3, 1, 1, 1],
+    [1, 1, 1, 3, 1, 1, 1, 1],
+]
+
+rockScores = [
+    [4, 3, 4, 4, 4, 4, 3, 4],
+    [4, 4, 4, 4, 4, 4, 4, 4],
+    [1, 1, 2, 3, 3, 2, 1, 1],
+    [1, 2, 3, 4, 4, 3, 2, 1],
+    [1, 2, 3, 4, 4, 3, 2, 1],
+    [1, 1, 2, 3, 3, 2, 1, 1],
+    [4, 4, 4, 4, 4, 4, 4, 4],
+    [4, 3, 4, 4, 4, 4, 3, 4],
+]
+
+whitePawnScores = [
+    [8, 8, 8, 8, 8, 8, 8, 8],
+    [8, 8, 8, 8, 8, 8, 8, 8],
+    [5, 6, 6, 7, 7, 6, 6, 5],
+    [2, 3, 3, 5, 5, 3, 3, 2],
+    [1, 2, 3, 4, 4, 3, 2, 1],
+    [1, 1, 2, 3, 3, 2, 1, 1],
+    [1, 1, 1, 0, 0, 1, 1, 1],
+    [0, 0, 0, 0, 0, 0, 0, 0],
+]
+
+blackPawnScores = [
+    [0, 0, 0, 0, 0, 0, 0, 0],
+    [1, 1, 1, 0, 0, 1, 1, 1],
+    [1, 1, 2, 3, 3, 2, 1, 1],
+    [1, 2, 3, 4, 4, 3, 2, 1],
+    [2, 3, 3, 5, 5, 3, 3, 2],
+    [5, 6, 6, 7, 7, 6, 6, 5],
+    [8, 8, 8, 8, 8, 8, 8, 8],
+    [8, 8, 8, 8, 8, 8, 8, 8],
+]
+
+# map eaching of the pieces to the appropriate 2d array
+piecePositionScores = {
+    "N": knightScores,
+    "B": bishopScores,
+    "Q": queenScores,
+    "R": rockScores,
+    "bp": blackPawnScores,
+    "wp": whitePawnScores,
+}
+
+# the square tables count a tenth of a pawn per point, so every score
+# built from the flat tables below is in tenths of a pawn
+SCORE_SCALE = 10
+
+
+def buildPieceSquareScores():
+    # PIECE_SQUARE_SCORES[piece code][row * 8 + col], positive for white and negative for black
+    table = [[0] * 64]
+    for piece in PIECE_NAMES[1:]:
+        color, pieceType = piece[0], piece[1]
+        sign = 1 if color == "w" else -1
+        scores = []
+        for sq in range(64):
+            row, col = divmod(sq, 8)
+            score = pieceScore[pieceType] * SCORE_SCALE
+            if pieceType != "K":
+                score += piecePositionScores[piece if pieceType == "p" else pieceType][row][col]
+            scores.append(sign * score)
+        table.append(scores)
+    return table
+
+
+PIECE_SQUARE_SCORES = buildPieceSquareScores()
+
+
+"""
+adds up material and square scores of the whole board from scratch,
+GameState only calls it once and then keeps boardScore up to date itself
+"""
+
+
+def computeBoardScore(board):
+    score = 0
+    for row in range(len(board)):
+        for col in range(len(board[row])):
+            square = board[row][col]
+            if square != "--":
+                color = square[0]
+                piece = square[1]
+                pps = 0
+                if piece != "K":
+                    pps = piecePositionScores[piece if piece != "p" else square][row][col]
+                if color == "w":
+                    score += pieceScore[piece] * SCORE_SCALE + pps
+                elif color == "b":
+                    score -= pieceScore[piece] * SCORE_SCALE + pps
+    return score
@@ -0,0 +1,21 @@
+# every piece gets a small number so it fits inside a packed move
+PIECE_NAMES = ("--", "wp", "wN", "wB", "wR", "wQ", "wK", "bp", "bN", "bB", "bR", "bQ", "bK")
+PIECE_CODES = {piece: code for code, piece in enumerate(PIECE_NAMES)}
+
+"""
+inside the engine a move is a single int instead of a Move object:
+ bits 0-5    start square (row * 8 + col)
+ bits 6-11   end square
+ bits 12-13  flag, ENPASSANT_FLAG or CASTLE_FLAG
+ bits 14-17  code of the piece a pawn promotes to, 0 if it's not a promotion
+ bits 18-21  code of the captured piece, 0 if nothing is captured
+ bits 22-25  code of the moved piece
+"""
+ENPASSANT_FLAG = 1
+CASTLE_FLAG = 2
+# what GameState.makeNullMove() puts in moveCodeLog, no real move has a moved piece code of 0
+NULL_MOVE = 0
+
+
+def encodeMove(startSq, endSq, pieceMoved, pieceCaptured=0, flag=0, promotion=0):
+    return startSq | endSq << 6 | flag << 12 | promotion << 14 | pieceCaptured << 18 | pieceMoved << 22
@@ -0,0 +1,248 @@
+"""
+decides in which order the search tries the moves of a node, the sooner
+the best move comes the sooner alpha-beta can cut off the rest:
+ 1. the move the transposition table remembers for the position
+ 2. captures and promotions, most valuable victim first and with the
+    least valuable attacker first among equal victims (MVV-LVA)
+ 3. the two killer moves of the ply, quiet moves that caused a cutoff
+    in a sibling position
+ 4. the other quiet moves by their history score
+MovePicker hands the moves of a node out in that order one stage at a time
+(with the captures that lose material moved behind the quiet moves), it
+also has the static exchange evaluation the quiescence search uses to skip
+captures that lose material
+"""
+
+from evaluation import SCORE_SCALE, pieceScore
+from moveEncoding import PIECE_CODES, PIECE_NAMES
+
+# deepest ply the killer table keeps moves for
+MAX_PLY = 64
+
+HASH_MOVE_SCORE = 1 << 24
+CAPTURE_SCORE = 1 << 20
+KILLER_SCORES = (1 << 19, (1 << 19) - 1)
+# history scores are halved once they get here so they stay below the killers
+HISTORY_LIMIT = 1 << 18
+# captures and queen promotions come with the captures, underpromotions with the quiet moves
+QUEEN_CODES = (PIECE_CODES["wQ"], PIECE_CODES["bQ"])
+
+
+def pieceValue(piece):
+    return pieceScore[piece[1]] if piece != "--" else 0
+
+
+# the king is worth nothing in the evaluation but it should be the last piece to capture with
+ATTACKER_VALUES = [pieceValue(piece) if piece[1] != "K" else 20 for piece in PIECE_NAMES]
+# MVV_LVA[captured piece code][moving piece code], 0 when nothing is captured
+MVV_LVA = [
+    [pieceValue(captured) * 100 - attacker if captured != "--" else 0 for attacker in ATTACKER_VALUES]
+    for captured in PIECE_NAMES
+]
+# a promotion counts like capturing the piece the pawn turns into
+PROMOTION_SCORES = [pieceValue(piece) * 100 for piece in PIECE_NAMES]
+# piece values in evaluation units for the static exchange evaluation
+EXCHANGE_VALUES = [pieceValue(piece) * SCORE_SCALE for piece in PIECE_NAMES]
+
+
+def captureScore(move):
+    return MVV_LVA[move >> 18 & 15][move >> 22 & 15] + PROMOTION_SCORES[move >> 14 & 15]
+
+
+class MoveOrderer:
+    def __init__(self):
+        self.killers = [[None, None] for _ in range(MAX_PLY)]
+        # indexed by start square * 64 + end square
+        self.history = [0] * 4096
+
+    """
+    killers only make sense within one search, the history is kept
+    but halved so the older searches count less and less
+    """
+
+    def newSearch(self):
+        self.killers = [[None, None] for _ in range(MAX_PLY)]
+        self.history = [score >> 1 for score in self.history]
+
+    def orderMoves(self, moves, hashMove, ply):
+        killers = self.killers[ply] if ply < MAX_PLY else (None, None)
+        history = self.history
+
+        def moveScore(move):
+            if move == hashMove:
+                return HASH_MOVE_SCORE
+            pieceCaptured = move >> 18 & 15
+            promotion = move >> 14 & 15
+            if pieceCaptured or promotion:
+                return CAPTURE_SCORE + MVV_LVA[pieceCaptured][move >> 22 & 15] + PROMOTION_SCORES[promotion]
+            if move == killers[0]:
+                return KILLER_SCORES[0]
+            if move == killers[1]:
+                return KILLER_SCORES[1]
+            return history[move & 4095]
+
+        return sorted(moves, key=moveScore, reverse=True)
+
+    """
+    called when a move caused a beta cutoff, only quiet moves are remembered
+    since captures are already ordered well by MVV-LVA
+    """
+
+    def recordCutoff(self, move, depth, ply):
+        if move >> 18 & 15 or move >> 14 & 15:
+            return
+        if ply < MAX_PLY:
+            killers = self.killers[ply]
+            if killers[0] != move:
+                killers[1] = killers[0]
+                killers[0] = move
+        # start square * 64 + end square are the low 12 bits of a packed move
+        index = move & 4095
+        self.history[index] += depth * depth
+        if self.history[index] >= HISTORY_LIMIT:
+            self.history = [score >> 1 for score in self.history]
+
+
+"""
+the legal moves of a node one at a time and in stages, so a cutoff by the
+hash move or a good capture saves generating and testing the moves after it:
+ 1. the hash move
+ 2. captures and queen promotions that don't lose material, by MVV-LVA
+ 3. the killer moves of the ply
+ 4. the quiet moves (underpromotions and castling too) by history score
+ 5. the captures the static exchange evaluation says lose material
+the pins and checks are looked up once and every move is only tested for
+legality right before it's handed out. the position has to be back as it was
+whenever the next move is asked for; without an orderer the moves come in the
+order they're generated after the hash move
+"""
+
+
+class MovePicker:
+    def __init__(self, gs, orderer, hashMove, ply, stats=None):
+        self.gs = gs
+        self.orderer = orderer
+        self.hashMove = hashMove
+        self.ply = ply
+        self.stats = stats
+        self.pinsAndChecks = gs.checkForPinsAndChecks()
+        self.inCheck = self.pinsAndChecks[0]
+
+    def __iter__(self):
+        gs = self.gs
+        pinsAndChecks = self.pinsAndChecks
+        isLegalMove = gs.isLegalMove
+        hashMove = self.hashMove
+        stats = self.stats
+        if hashMove is not None and gs.isPseudoLegal(hashMove) and isLegalMove(hashMove, pinsAndChecks):
+            yield hashMove
+        orderer = self.orderer
+        if orderer is None:
+            for move in self.quietMoves(noisy=True):
+                if move != hashMove and isLegalMove(move, pinsAndChecks):
+                    yield move
+            return
+        if stats is None:
+            captures = gs.getAllPossibleCaptures()
+        else:
+            captures = stats.generateCaptures(gs.getAllPossibleCaptures)
+        captures.sort(key=captureScore, reverse=True)
+        losingCaptures = []
+        for move in captures:
+            if move == hashMove:
+                continue
+            gain = EXCHANGE_VALUES[move >> 18 & 15] + EXCHANGE_VALUES[move >> 14 & 15]
+            if EXCHANGE_VALUES[move >> 22 & 15] > gain and staticExchange(gs, move) < 0:
+                losingCaptures.append(move)
+            elif isLegalMove(move, pinsAndChecks):
+                yield move
+        killer1, killer2 = orderer.killers[self.ply] if self.ply < MAX_PLY else (None, None)
+        for killer in (killer1, killer2):
+            if (
+                killer is not None
+                and killer != hashMove
+                and gs.isPseudoLegal(killer)
+                and isLegalMove(killer, pinsAndChecks)
+            ):
+                yield killer
+        history = orderer.history
+        quietMoves = self.quietMoves()
+        quietMoves.sort(key=lambda move: history[move & 4095], reverse=True)
+        for move in quietMoves:
+            if move != hashMove and move != killer1 and move != killer2 and isLegalMove(move, pinsAndChecks):
+                yield move
+        for move in losingCaptures:
+            if isLegalMove(move, pinsAndChecks):
+                yield move
+
+    """
+    the pseudo-legal moves that don't come with the captures plus castling,
+    all pseudo-legal moves when noisy is set
+    """
+
+    def quietMoves(self, noisy=False):
+        gs = self.gs
+        if self.stats is None:
+            moves = gs.getAllPossibleMoves()
+        else:
+            moves = self.stats.generate(gs.getAllPossibleMoves)
+        if not noisy:
+            moves = [
+                move
+                for move in moves
+                if not (move >> 14 & 15 in QUEEN_CODES or (move >> 18 & 15 and not move >> 14 & 15))
+            ]
+        kingRow, kingCol = gs.whiteKingLocation if gs.whiteToMove else gs.blackKingLocation
+        gs.getCastleMoves(kingRow, kingCol, moves)
+        return moves
+
+
+"""
+static exchange evaluation: plays out every capture on the end square of the
+move, each side taking with its least valuable piece and free to stop when
+going on would lose material, and returns what the move wins in evaluation
+units (negative when it loses material); the pieces that already took are
+lifted off the board so the sliders behind them join in
+"""
+
+
+def staticExchange(gs, move):
+    board = gs.board
+    bitboards = gs.bitboards
+    endSq = move >> 6 & 63
+    square = (endSq >> 3, endSq & 7)
+    promotion = move >> 14 & 15
+    onSquare = move >> 22 & 15
+    gains = [EXCHANGE_VALUES[move >> 18 & 15]]
+    if promotion:
+        gains[0] += EXCHANGE_VALUES[promotion] - EXCHANGE_VALUES[onSquare]
+        onSquare = promotion
+    lifted = []
+    startSq = move & 63
+    row, col = startSq >> 3, startSq & 7
+    color = "b" if PIECE_NAMES[onSquare][0] == "w" else "w"
+    while True:
+        piece = board[row][col]
+        lifted.append((row, col, piece))
+        board[row][col] = "--"
+        if bitboards is not None:
+            bitboards.toggle(piece, row * 8 + col)
+        attackers = gs.attackersOf(square, color)
+        if not attackers:
+            break
+        row, col = min(
+            attackers, key=lambda attacker: ATTACKER_VALUES[PIECE_CODES[board[attacker[0]][attacker[1]]]]
+        )
+        if board[row][col][1] == "K" and gs.attackersOf(square, "w" if color == "b" else "b"):
+            break  # the king can't take a defended piece
+        gains.append(EXCHANGE_VALUES[onSquare] - gains[-1])
+        onSquare = PIECE_CODES[board[row][col]]
+        color = "w" if color == "b" else "b"
+    for row, col, piece in reversed(lifted):
+        board[row][col] = piece
+        if bitboards is not None:
+            bitboards.toggle(piece, row * 8 + col)
+    # every side only goes on with the exchange when that's better than stopping
+    for i in range(len(gains) - 1, 0, -1):
+        gains[i - 1] = -max(-gains[i - 1], gains[i])
+    return gains[0]
@@ -0,0 +1,267 @@
+"""
+an opening book the engine plays from before it starts searching. the book
+is a binary file of fixed size records sorted by position:
+ 16 byte header: MAGIC and the number of records
+ every record (16 bytes): zobrist key of the position, packed move, weight
+the file is opened with mmap and probed with a binary search, so opening
+it costs nothing however big it is and every engine process reading the
+same book shares the same pages of memory
+
+build a book from PGN files and look into it:
+  python openingBook.py build games.pgn [more.pgn ...] [-o book.bin] [--max-ply 20]
+  python openingBook.py probe [book.bin] [--fen FEN]
+"""
+
+import argparse
+import mmap
+import os
+import random
+import re
+import struct
+
+from chessEngine import CASTLE_FLAG, START_FEN, GameState, Move
+from moveEncoding import PIECE_NAMES
+
+MAGIC = b"CEBOOK01"
+HEADER = struct.Struct(">8sQ")
+RECORD = struct.Struct(">QIH2x")
+KEY = struct.Struct(">Q")
+# the book next to the engine that smartMoveFinder.findBookMove() plays from when it exists
+DEFAULT_BOOK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "book.bin")
+# how many plies of every game go into the book
+DEFAULT_MAX_PLY = 20
+MAX_WEIGHT = 0xFFFF
+
+RESULTS = ("1-0", "0-1", "1/2-1/2", "*")
+
+
+class OpeningBook:
+    def __init__(self, path):
+        self.file = open(path, "rb")
+        try:
+            self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # an empty file can't be mapped
+            self.file.close()
+            raise ValueError("%s is not an opening book" % path)
+        if len(self.data) < HEADER.size:
+            self.close()
+            raise ValueError("%s is not an opening book" % path)
+        magic, self.size = HEADER.unpack_from(self.data, 0)
+        if magic != MAGIC or HEADER.size + self.size * RECORD.size != len(self.data):
+            self.close()
+            raise ValueError("%s is not an opening book" % path)
+
+    def close(self):
+        self.data.close()
+        self.file.close()
+
+    """
+    all (move, weight) records of the position with this key, the binary
+    search finds the first record of the key and the rest follow it
+    """
+
+    def probe(self, key):
+        low, high = 0, self.size
+        while low < high:
+            middle = (low + high) // 2
+            if KEY.unpack_from(self.data, HEADER.size + middle * RECORD.size)[0] < key:
+                low = middle + 1
+            else:
+                high = middle
+        entries = []
+        offset = HEADER.size + low * RECORD.size
+        while low < self.size:
+            recordKey, move, weight = RECORD.unpack_from(self.data, offset)
+            if recordKey != key:
+                break
+            entries.append((move, weight))
+            low += 1
+            offset += RECORD.size
+        return entries
+
+    """
+    picks one of the legal book moves of the position, the higher its weight the
+    more likely, returns a packed move or None when the position isn't in the book
+    """
+
+    def chooseMove(self, gs, rng=random):
+        entries = self.probe(gs.zobristKey)
+        if not entries:
+            return None
+        legalMoves = set(gs.getValidMoveCodes())
+        entries = [(move, weight) for move, weight in entries if move in legalMoves and weight > 0]
+        if not entries:
+            return None
+        pick = rng.randrange(sum(weight for _, weight in entries))
+        for move, weight in entries:
+            if pick < weight:
+                return move
+            pick -= weight
+
+
+"""
+the packed move of a move in standard algebraic notation (like Nf3, exd5,
+O-O, e8=Q+, Nbd7) in this position, None when it's not a legal move
+"""
+
+
+def moveFromSan(gs, san):
+    san = san.rstrip("+#!?")
+    moves = gs.getValidMoveCodes()
+    if san in ("O-O", "0-0", "O-O-O", "0-0-0"):
+        kingSide = len(san) == 3
+        for move in moves:
+            if move >> 12 & 3 == CASTLE_FLAG and ((move >> 6 & 7) == 6) == kingSide:
+                return move
+        return None
+    promotion = None
+    if "=" in san:
+        san, promotion = san.split("=", 1)
+    elif len(san) > 2 and san[-1] in "QRBN" and san[-2].isdigit():
+        san, promotion = san[:-1], san[-1]
+    pieceType = san[0] if san and san[0] in "NBRQK" else "p"
+    if pieceType != "p":
+        san = san[1:]
+    san = san.replace("x", "").replace("-", "")
+    if len(san) < 2 or san[-2] not in "abcdefgh" or san[-1] not in "12345678":
+        return None
+    endSq = (8 - int(san[-1])) * 8 + "abcdefgh".index(san[-2])
+    disambiguation = san[:-2]
+    candidates = []
+    for move in moves:
+        if (move >> 6 & 63) != endSq or PIECE_NAMES[move >> 22 & 15][1] != pieceType:
+            continue
+        movePromotion = move >> 14 & 15
+        if (PIECE_NAMES[movePromotion][1] if movePromotion else None) != promotion:
+            continue
+        startSq = move & 63
+        if any(
+            (char in "abcdefgh" and "abcdefgh".index(char) != startSq & 7)
+            or (char in "12345678" and 8 - int(char) != startSq >> 3)
+            for char in disambiguation
+        ):
+            continue
+        candidates.append(move)
+    return candidates[0] if len(candidates) == 1 else None
+
+
+"""
+the games of a PGN text as lists of SAN moves with their result, tags,
+comments, variations and move numbers are dropped
+"""
+
+
+def readPgnGames(text):
+    text = re.sub(r"^\[.*\]\s*$", " ", text, flags=re.MULTILINE)
+    text = re.sub(r"\{[^}]*\}", " ", text)
+    text = re.sub(r";[^\n]*", " ", text)
+    previous = None
+    while previous != text:  # innermost variations first so nested ones go too
+        previous = text
+        text = re.sub(r"\([^()]*\)", " ", text)
+    text = re.sub(r"\$\d+", " ", text)
+    moves = []
+    for token in text.split():
+        if token in RESULTS:
+            if moves:
+                yield moves, token
+            moves = []
+            continue
+        token = re.sub(r"^\d+\.+", "", token)
+        if token:
+            moves.append(token)
+    if moves:
+        yield moves, "*"
+
+
+"""
+plays the first maxPly moves of every game and adds up a weight for every
+(position, move): 2 when the side that played it won the game, 1 for a draw
+or an unknown result and nothing for a loss
+"""
+
+
+def collectBookMoves(pgnPaths, maxPly=DEFAULT_MAX_PLY):
+    weights = {}
+    games = 0
+    for path in pgnPaths:
+        with open(path, encoding="utf-8", errors="replace") as pgnFile:
+            text = pgnFile.read()
+        for sanMoves, result in readPgnGames(text):
+            games += 1
+            gs = GameState()
+            for san in sanMoves[:maxPly]:
+                move = moveFromSan(gs, san)
+                if move is None:
+                    break  # not a move of this position, the rest of the game can't be trusted
+                if result == "1-0":
+                    weight = 2 if gs.whiteToMove else 0
+                elif result == "0-1":
+                    weight = 0 if gs.whiteToMove else 2
+                else:
+                    weight = 1
+                record = (gs.zobristKey, move)
+                weights[record] = weights.get(record, 0) + weight
+                gs.makeMoveCode(move)
+    return weights, games
+
+
+def writeBook(path, weights):
+    records = sorted((key, move, min(weight, MAX_WEIGHT)) for (key, move), weight in weights.items() if weight > 0)
+    with open(path, "wb") as bookFile:
+        bookFile.write(HEADER.pack(MAGIC, len(records)))
+        for record in records:
+            bookFile.write(RECORD.pack(*record))
+    return len(records)
+
+
+"""
+the book at DEFAULT_BOOK_PATH, opened the first time it's needed,
+None when there is no book
+"""
+
+defaultBook = None
+defaultBookLoaded = False
+
+
+def getDefaultBook():
+    global defaultBook, defaultBookLoaded
+    if not defaultBookLoaded:
+        defaultBookLoaded = True
+        if os.path.exists(DEFAULT_BOOK_PATH):
+            try:
+                defaultBook = OpeningBook(DEFAULT_BOOK_PATH)
+            except ValueError:
+                defaultBook = None
+    return defaultBook
+
+
+def main():
+    parser = argparse.ArgumentParser(description="build or look into an opening book")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="compile PGN files into a book")
+    build.add_argument("pgn", nargs="+")
+    build.add_argument("-o", "--output", default=DEFAULT_BOOK_PATH)
+    build.add_argument("--max-ply", type=int, default=DEFAULT_MAX_PLY)
+    probe = commands.add_parser("probe", help="list the book moves of a position")
+    probe.add_argument("book", nargs="?", default=DEFAULT_BOOK_PATH)
+    probe.add_argument("--fen", default=START_FEN)
+    args = parser.parse_args()
+    if args.command == "build":
+        weights, games = collectBookMoves(args.pgn, args.max_ply)
+        records = writeBook(args.output, weights)
+        print("%d games, %d book moves written to %s" % (games, records, args.output))
+    else:
+        book = OpeningBook(args.book)
+        gs = GameState(fen=args.fen)
+        entries = sorted(book.probe(gs.zobristKey), key=lambda entry: -entry[1])
+        total = sum(weight for _, weight in entries)
+        for move, weight in entries:
+            print("%-6s weight %5d  %5.1f%%" % (Move.fromCode(move).getChessNotation(), weight, weight * 100 / total))
+        if not entries:
+            print("position not in the book")
+        book.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+compares the single process search with a ParallelSearch on a fixed set of
+positions and reports the time, nodes and speedup of each worker count,
+the parallel search is only faster on a machine with more than one cpu
+
+usage: python parallelBenchmark.py [depth] [workers ...]
+"""
+
+import os
+import sys
+import time
+
+from chessEngine import GameState
+from searchBenchmark import BENCHMARK_POSITIONS
+from smartMoveFinder import ParallelSearch, Search
+
+
+def runPositions(search, depth):
+    nodes = 0
+    bestMoves = []
+    start = time.perf_counter()
+    for fen in BENCHMARK_POSITIONS.values():
+        result = search.iterativeDeepening(GameState(fen=fen), depth)
+        nodes += result.nodes
+        bestMoves.append(result.bestMove)
+    return time.perf_counter() - start, nodes, bestMoves
+
+
+def main():
+    depth = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    workerCounts = [int(arg) for arg in sys.argv[2:]] or [2, os.cpu_count() or 1]
+    print("%d positions, depth %d, %d cpus" % (len(BENCHMARK_POSITIONS), depth, os.cpu_count() or 1))
+    baseSeconds, nodes, bestMoves = runPositions(Search(), depth)
+    print("%-12s %7.2fs  nodes %d" % ("1 process", baseSeconds, nodes))
+    for workers in sorted(set(workerCounts)):
+        if workers < 2:
+            continue
+        search = ParallelSearch(workers)
+        search.start()  # the pool start-up isn't part of the search time
+        try:
+            seconds, nodes, parallelBestMoves = runPositions(search, depth)
+        finally:
+            search.close()
+        sameMoves = sum(a == b for a, b in zip(bestMoves, parallelBestMoves))
+        print(
+            "%-12s %7.2fs  nodes %d  speedup %.2fx  same best move %d/%d"
+            % ("%d workers" % workers, seconds, nodes, baseSeconds / seconds, sameMoves, len(BENCHMARK_POSITIONS))
+        )
+
+
+if __name__ == "__main__":
+    main()
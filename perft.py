@@ -0,0 +1,149 @@
+"""
+counts the leaf nodes of the legal move tree (perft) to check the move generator
+against known numbers and to time it; divide prints the count below every root
+move so a wrong count can be followed down to the move that causes it
+
+usage:
+  python perft.py depth [--fen FEN | --position NAME] [--divide] [--bitboards]
+  python perft.py --suite [--max-nodes N] [--bitboards]
+"""
+
+import argparse
+import sys
+import time
+
+from chessEngine import START_FEN, GameState, Move
+
+# name: (fen, expected node counts for depth 1, 2, 3, ...)
+REFERENCE_POSITIONS = {
+    "start": (START_FEN, [20, 400, 8902, 197281, 4865609]),
+    # lots of castling, en-passant and promotions in one position
+    "kiwipete": (
+        "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+        [48, 2039, 97862, 4085603],
+    ),
+    # en-passant captures that would uncover a check along the rank
+    "endgame": ("8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1", [14, 191, 2812, 43238, 674624]),
+    # promotions with capture and castling rights lost to a captured rook
+    "promotions": (
+        "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1",
+        [6, 264, 9467, 422333],
+    ),
+    "promotions mirrored": (
+        "r2q1rk1/pP1p2pp/Q4n2/bbp1p3/Np6/1B3NBn/pPPP1PPP/R3K2R b KQ - 0 1",
+        [6, 264, 9467, 422333],
+    ),
+    "underpromotion": ("rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8", [44, 1486, 62379, 2103487]),
+    "middlegame": (
+        "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10",
+        [46, 2079, 89890, 3894594],
+    ),
+    # the en-passant capture would leave the own king in check from the rook
+    "illegal en-passant": ("3k4/3p4/8/K1P4r/8/8/8/8 b - - 0 1", [18, 92, 1670, 10138, 185429, 1134888]),
+    # the en-passant capture gives check
+    "en-passant check": ("8/8/1k6/2b5/2pP4/8/5K2/8 b - d3 0 1", [15, 126, 1928, 13931, 206379, 1440467]),
+    # castling gives check, castling out of check and through an attacked square
+    "short castle check": ("5k2/8/8/8/8/8/8/4K2R w K - 0 1", [15, 66, 1198, 6399, 120330, 661072]),
+    "long castle check": ("3k4/8/8/8/8/8/8/R3K3 w Q - 0 1", [16, 71, 1286, 7418, 141077, 803711]),
+    "castling rights": ("r3k2r/1b4bq/8/8/8/8/7B/R3K2R w KQkq - 0 1", [26, 1141, 27826, 1274206]),
+    "castling prevented": ("r3k2r/8/3Q4/8/8/5q2/8/R3K2R b KQkq - 0 1", [44, 1494, 50509, 1720476]),
+    "promote out of check": ("2K2r2/4P3/8/8/8/8/8/3k4 w - - 0 1", [11, 133, 1442, 19174, 266199, 3821001]),
+    "underpromote to check": ("8/P1k5/K7/8/8/8/8/8 w - - 0 1", [6, 27, 273, 1329, 18135, 92683]),
+    "self stalemate": ("K1k5/8/P7/8/8/8/8/8 w - - 0 1", [2, 6, 13, 63, 382, 2217]),
+    "discovered check": ("8/8/1P2K3/8/2n5/1q6/8/5k2 b - - 0 1", [29, 165, 5160, 31961, 1004658]),
+    "promote to check": ("4k3/1P6/8/8/8/8/K7/8 w - - 0 1", [9, 40, 472, 2661, 38983, 217342]),
+    "checkmate and stalemate": ("8/k1P5/8/1K6/8/8/8/8 w - - 0 1", [10, 25, 268, 926, 10857, 43261, 567584]),
+    "queen and knight checks": ("8/8/2k5/5q2/5n2/8/5K2/8 b - - 0 1", [37, 183, 6559, 23527]),
+}
+
+
+def perft(gs, depth):
+    if depth == 0:
+        return 1
+    moves = gs.getValidMoveCodes()
+    if depth == 1:
+        return len(moves)
+    nodes = 0
+    for move in moves:
+        gs.makeMoveCode(move)
+        nodes += perft(gs, depth - 1)
+        gs.undoMoveCode()
+    return nodes
+
+
+"""
+the perft count below every root move, keyed by the move in coordinate notation
+"""
+
+
+def divide(gs, depth):
+    counts = {}
+    for move in gs.getValidMoveCodes():
+        gs.makeMoveCode(move)
+        counts[Move.fromCode(move).getChessNotation()] = perft(gs, depth - 1)
+        gs.undoMoveCode()
+    return counts
+
+
+"""
+runs every reference position up to the deepest depth whose expected count is
+at most maxNodes, prints one line per position and returns the number of wrong counts
+"""
+
+
+def runSuite(maxNodes, useBitboards=False):
+    failures = 0
+    totalNodes = 0
+    start = time.perf_counter()
+    for name, (fen, expectedCounts) in REFERENCE_POSITIONS.items():
+        gs = GameState(useBitboards=useBitboards, fen=fen)
+        results = []
+        for depth, expected in enumerate(expectedCounts, 1):
+            if expected > maxNodes:
+                break
+            nodes = perft(gs, depth)
+            totalNodes += nodes
+            if nodes == expected:
+                results.append("%d ok" % depth)
+            else:
+                failures += 1
+                results.append("%d FAILED %d != %d" % (depth, nodes, expected))
+        print("%-24s %s" % (name, ", ".join(results)))
+    seconds = time.perf_counter() - start
+    print(
+        "%d wrong counts, %d nodes in %.2fs, %.0f nodes/s"
+        % (failures, totalNodes, seconds, totalNodes / seconds)
+    )
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="perft node counts of the move generator")
+    parser.add_argument("depth", type=int, nargs="?", default=3)
+    parser.add_argument("--fen", help="position to count from, the start position by default")
+    parser.add_argument("--position", choices=sorted(REFERENCE_POSITIONS), help="one of the reference positions")
+    parser.add_argument("--divide", action="store_true", help="print the count below every root move")
+    parser.add_argument("--bitboards", action="store_true", help="use the bitboard backend")
+    parser.add_argument("--suite", action="store_true", help="check all the reference positions")
+    parser.add_argument(
+        "--max-nodes", type=int, default=200000, help="deepest suite depth to run, as an expected node count"
+    )
+    args = parser.parse_args()
+    if args.suite:
+        sys.exit(1 if runSuite(args.max_nodes, args.bitboards) else 0)
+    fen = REFERENCE_POSITIONS[args.position][0] if args.position else args.fen or START_FEN
+    gs = GameState(useBitboards=args.bitboards, fen=fen)
+    start = time.perf_counter()
+    if args.divide:
+        counts = divide(gs, args.depth)
+        for notation in sorted(counts):
+            print("%s: %d" % (notation, counts[notation]))
+        nodes = sum(counts.values())
+    else:
+        nodes = perft(gs, args.depth)
+    seconds = time.perf_counter() - start
+    print("depth %d nodes %d time %.2fs %.0f nodes/s" % (args.depth, nodes, seconds, nodes / max(seconds, 1e-9)))
+
+
+if __name__ == "__main__":
+    main()
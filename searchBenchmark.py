@@ -0,0 +1,197 @@
+"""
+runs the search on a fixed set of positions, once to a fixed depth and once
+for a fixed time per position, and records nodes, nodes per second, time to
+depth, best move and score of every position; the results can be written as
+JSON and compared against a saved baseline, which flags every number that got
+worse by more than the threshold (and exits with 1 so a script can stop on it).
+it only imports the engine, never pygame, so it runs headless
+
+usage:
+  python searchBenchmark.py [--depth D] [--time SECONDS] [--output FILE] [--stats]
+  python searchBenchmark.py --compare BASELINE [--threshold 0.10] [--output FILE]
+"""
+
+import argparse
+import json
+import platform
+import sys
+import time
+
+from chessEngine import START_FEN, GameState, Move
+from smartMoveFinder import Search
+
+BENCHMARK_POSITIONS = {
+    "start": START_FEN,
+    "italian": "r1bqk2r/pppp1ppp/2n2n2/2b1p3/2B1P3/2P2N2/PP1P1PPP/RNBQK2R w KQkq - 1 5",
+    "queens gambit": "r1bq1rk1/pppnbppp/4pn2/3p2B1/2PP4/2N1PN2/PP3PPP/R2QKB1R w KQ - 3 7",
+    "kiwipete": "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+    "middlegame": "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10",
+    "rook endgame": "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+    "pawn race": "8/5k2/8/1p6/8/6P1/5K2/8 w - - 0 1",
+}
+
+DEFAULT_DEPTH = 4
+DEFAULT_TIME = 1.0
+# how much worse (as a fraction) a number may get before compare calls it a regression
+DEFAULT_THRESHOLD = 0.10
+# positions that finish quicker than this are too noisy to compare their time
+MIN_COMPARED_SECONDS = 0.25
+
+
+def searchPosition(fen, depth=None, timeLimit=None, collectStats=False):
+    gs = GameState(fen=fen)
+    # a fresh Search for every position so the transposition table doesn't carry over
+    search = Search(collectStats=collectStats)
+    result = search.iterativeDeepening(gs, depth if depth is not None else 64, timeLimit=timeLimit)
+    record = {
+        "depth": result.depth,
+        "nodes": result.nodes,
+        "seconds": result.seconds,
+        "nps": result.nodes / result.seconds if result.seconds > 0 else 0.0,
+        "bestMove": Move.fromCode(result.bestMove).getChessNotation() if result.bestMove is not None else None,
+        "score": result.score,
+    }
+    if result.stats is not None:
+        record["stats"] = result.stats.asDict()
+    return record
+
+
+def totals(results):
+    nodes = sum(result["nodes"] for result in results.values())
+    seconds = sum(result["seconds"] for result in results.values())
+    return {
+        "nodes": nodes,
+        "seconds": seconds,
+        "nps": nodes / seconds if seconds > 0 else 0.0,
+        "depth": sum(result["depth"] for result in results.values()),
+    }
+
+
+def runBenchmark(depth, timeLimit, collectStats=False):
+    fixedDepth = {}
+    fixedTime = {}
+    for name, fen in BENCHMARK_POSITIONS.items():
+        # stats cost a little time so they are only collected at fixed depth
+        fixedDepth[name] = searchPosition(fen, depth=depth, collectStats=collectStats)
+        printResult("depth %d" % depth, name, fixedDepth[name])
+    for name, fen in BENCHMARK_POSITIONS.items():
+        fixedTime[name] = searchPosition(fen, timeLimit=timeLimit)
+        printResult("%.1fs" % timeLimit, name, fixedTime[name])
+    return {
+        "settings": {"depth": depth, "timeLimit": timeLimit},
+        "machine": {"python": platform.python_version(), "platform": platform.platform()},
+        "date": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "fixedDepth": {"positions": fixedDepth, "totals": totals(fixedDepth)},
+        "fixedTime": {"positions": fixedTime, "totals": totals(fixedTime)},
+    }
+
+
+def printResult(mode, name, result):
+    print(
+        "%-8s %-14s depth %2d  nodes %8d  %6.2fs  %7.0f nps  %-6s score %d"
+        % (
+            mode,
+            name,
+            result["depth"],
+            result["nodes"],
+            result["seconds"],
+            result["nps"],
+            result["bestMove"],
+            result["score"],
+        )
+    )
+
+
+"""
+returns the list of regressions of current against baseline, every one is a line of text:
+at fixed depth more nodes or more time, at fixed time fewer nodes per second or a lower depth;
+a different best move at fixed depth is listed as well since it means the search changed
+"""
+
+
+def compareResults(baseline, current, threshold):
+    regressions = []
+
+    def check(label, base, value, higherIsWorse):
+        if base == 0:
+            return
+        change = (value - base) / base
+        if (change if higherIsWorse else -change) > threshold:
+            regressions.append(
+                "%s: %s -> %s (%+.1f%%)" % (label, roundNumber(base), roundNumber(value), change * 100)
+            )
+
+    if baseline["settings"] != current["settings"]:
+        regressions.append("settings differ: %s -> %s" % (baseline["settings"], current["settings"]))
+        return regressions
+    for section, checks in (
+        ("fixedDepth", (("nodes", True), ("seconds", True))),
+        ("fixedTime", (("nps", False), ("depth", False))),
+    ):
+        basePositions = baseline[section]["positions"]
+        for name, result in current[section]["positions"].items():
+            if name not in basePositions:
+                continue
+            for key, higherIsWorse in checks:
+                if key == "seconds" and basePositions[name][key] < MIN_COMPARED_SECONDS:
+                    continue
+                check("%s %s %s" % (section, name, key), basePositions[name][key], result[key], higherIsWorse)
+        baseTotals = baseline[section]["totals"]
+        for key, higherIsWorse in checks:
+            check("%s total %s" % (section, key), baseTotals[key], current[section]["totals"][key], higherIsWorse)
+    for name, result in current["fixedDepth"]["positions"].items():
+        base = baseline["fixedDepth"]["positions"].get(name)
+        if base is not None and base["bestMove"] != result["bestMove"]:
+            regressions.append("fixedDepth %s best move: %s -> %s" % (name, base["bestMove"], result["bestMove"]))
+    return regressions
+
+
+def roundNumber(value):
+    return "%.2f" % value if isinstance(value, float) else str(value)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="search benchmark on a fixed set of positions")
+    parser.add_argument("--depth", type=int, default=DEFAULT_DEPTH, help="depth of the fixed depth runs")
+    parser.add_argument(
+        "--time", type=float, default=DEFAULT_TIME, help="seconds per position of the fixed time runs"
+    )
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="JSON file of an earlier run to compare against")
+    parser.add_argument("--stats", action="store_true", help="add the search stats of the fixed depth runs")
+    parser.add_argument(
+        "--threshold", type=float, default=DEFAULT_THRESHOLD, help="allowed slowdown as a fraction"
+    )
+    args = parser.parse_args()
+    baseline = None
+    if args.compare:
+        with open(args.compare) as baselineFile:
+            baseline = json.load(baselineFile)
+        # run with the same settings as the baseline so the numbers can be compared
+        args.depth = baseline["settings"]["depth"]
+        args.time = baseline["settings"]["timeLimit"]
+    results = runBenchmark(args.depth, args.time, args.stats)
+    print(
+        "fixed depth total: nodes %d  %.2fs  %.0f nps"
+        % (
+            results["fixedDepth"]["totals"]["nodes"],
+            results["fixedDepth"]["totals"]["seconds"],
+            results["fixedDepth"]["totals"]["nps"],
+        )
+    )
+    if args.output:
+        with open(args.output, "w") as outputFile:
+            json.dump(results, outputFile, indent=2)
+    if baseline is not None:
+        regressions = compareResults(baseline, results, args.threshold)
+        for regression in regressions:
+            print("REGRESSION " + regression)
+        print(
+            "%d regressions against %s (threshold %.0f%%)"
+            % (len(regressions), args.compare, args.threshold * 100)
+        )
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
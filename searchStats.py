@@ -0,0 +1,123 @@
+"""
+counters a Search fills in when it's created with collectStats=True, with
+stats turned off the search only pays for a few `is None` tests per node:
+ - nodes of the main search and of the quiescence search
+ - leaf evaluations (scoreBoard calls)
+ - beta cutoffs of the main search by the index of the move that caused them
+ - transposition table probes, hits and the hits that ended the node
+ - positions answered by the tablebases
+ - null moves tried and the ones that cut the node
+ - late moves searched at reduced depth, moves searched again after beating alpha
+   on a reduced or null window, and depths searched again after missing the
+   aspiration window
+ - calls of the full and capture-only move generators and the seconds spent
+   in them, next to the seconds spent evaluating
+"""
+
+import time
+
+
+class SearchStats:
+    def __init__(self):
+        self.nodes = 0
+        self.quiescenceNodes = 0
+        self.leafEvaluations = 0
+        # cutoffsByMoveIndex[i] is how many cutoffs the (i+1)th move tried caused
+        self.cutoffsByMoveIndex = []
+        self.ttProbes = 0
+        self.ttHits = 0
+        self.ttCutoffs = 0
+        self.tablebaseHits = 0
+        self.nullMoveTries = 0
+        self.nullMoveCutoffs = 0
+        self.reductions = 0
+        self.reSearches = 0
+        self.aspirationReSearches = 0
+        self.generatorCalls = 0
+        self.captureGeneratorCalls = 0
+        self.generatorSeconds = 0.0
+        self.evaluationSeconds = 0.0
+
+    def generate(self, generator):
+        start = time.perf_counter()
+        moves = generator()
+        self.generatorSeconds += time.perf_counter() - start
+        self.generatorCalls += 1
+        return moves
+
+    def generateCaptures(self, generator):
+        start = time.perf_counter()
+        moves = generator()
+        self.generatorSeconds += time.perf_counter() - start
+        self.captureGeneratorCalls += 1
+        return moves
+
+    def evaluate(self, evaluator, gs):
+        start = time.perf_counter()
+        score = evaluator(gs)
+        self.evaluationSeconds += time.perf_counter() - start
+        self.leafEvaluations += 1
+        return score
+
+    def cutoff(self, moveIndex):
+        while len(self.cutoffsByMoveIndex) <= moveIndex:
+            self.cutoffsByMoveIndex.append(0)
+        self.cutoffsByMoveIndex[moveIndex] += 1
+
+    def cutoffs(self):
+        return sum(self.cutoffsByMoveIndex)
+
+    def ttHitRate(self):
+        return self.ttHits / self.ttProbes if self.ttProbes else 0.0
+
+    def asDict(self):
+        return {
+            "nodes": self.nodes,
+            "quiescenceNodes": self.quiescenceNodes,
+            "leafEvaluations": self.leafEvaluations,
+            "cutoffsByMoveIndex": list(self.cutoffsByMoveIndex),
+            "ttProbes": self.ttProbes,
+            "ttHits": self.ttHits,
+            "ttCutoffs": self.ttCutoffs,
+            "tablebaseHits": self.tablebaseHits,
+            "nullMoveTries": self.nullMoveTries,
+            "nullMoveCutoffs": self.nullMoveCutoffs,
+            "reductions": self.reductions,
+            "reSearches": self.reSearches,
+            "aspirationReSearches": self.aspirationReSearches,
+            "generatorCalls": self.generatorCalls,
+            "captureGeneratorCalls": self.captureGeneratorCalls,
+            "generatorSeconds": self.generatorSeconds,
+            "evaluationSeconds": self.evaluationSeconds,
+        }
+
+    def __str__(self):
+        cutoffs = self.cutoffs()
+        # the share of cutoffs of the first three moves tried, the rest is summed up
+        shares = ["%.1f%%" % (count * 100 / cutoffs) for count in self.cutoffsByMoveIndex[:3]] if cutoffs else []
+        return (
+            "nodes %d (quiescence %d) evals %d cutoffs %d by move index %s "
+            "tt probes %d hits %.1f%% cutoffs %d tablebase hits %d "
+            "null moves %d/%d reductions %d re-searched %d aspiration %d "
+            "generator calls %d+%d captures %.2fs eval %.2fs"
+            % (
+                self.nodes,
+                self.quiescenceNodes,
+                self.leafEvaluations,
+                cutoffs,
+                "/".join(shares) or "-",
+                self.ttProbes,
+                self.ttHitRate() * 100,
+                self.ttCutoffs,
+                self.tablebaseHits,
+                self.nullMoveCutoffs,
+                self.nullMoveTries,
+                self.reductions,
+                self.reSearches,
+                self.aspirationReSearches,
+                self.generatorCalls,
+                self.captureGeneratorCalls,
+                self.generatorSeconds,
+                self.evaluationSeconds,
+            )
+        )
@@ -1,92 +1,51 @@
+import multiprocessing
+import os
 import random
+import time
 
-# assign the king any value which means you can't really lose
-# your king as it would be a checkmate before that happened
-pieceScore = {"K": 0, "Q": 10, "R": 5, "B": 3, "N": 3, "p": 1}
-
-# this is just a way to give some squares some prefrence than other when moving the each piece
-knightScores = [
-    [1, 1, 1, 1, 1, 1, 1, 1],
-    [1, 2, 2, 2, 2, 2, 2, 1],
-    [1, 2, 3, 3, 3, 3, 2, 1],
-    [1, 2, 3, 4, 4, 3, 2, 1],
-    [1, 2, 3, 4, 4, 3, 2, 1],
-    [1, 2, 3, 3, 3, 3, 2, 1],
-    [1, 2, 2, 2, 2, 2, 2, 1],
-    [1, 1, 1, 1, 1, 1, 1, 1],
-]
-
-bishopScores = [
-    [4, 3, 2, 1, 1, 2, 3, 4],
-    [3, 4, 3, 2, 2, 3, 4, 3],
-    [2, 3, 4, 3, 3, 4, 3, 2],
-    [1, 2, 3, 4, 4, 3, 2, 1],
-    [1, 2, 3, 4, 4, 3, 2, 1],
-    [2, 3, 4, 3, 3, 4, 3, 2],
-    [3, 4, 3, 2, 2, 3, 4, 3],
-    [4, 3, 2, 1, 1, 2, 3, 4],
-]
-
-queenScores = [
-    [1, 1, 1, 3, 1, 1, 1, 1],
-    [1, 2, 3, 3, 3, 1, 1, 1],
-    [1, 4, 3, 3, 3, 4, 2, 1],
-    [1, 2, 3, 3, 3, 2, 2, 1],
-    [1, 2, 3, 3, 3, 2, 2, 1],
-    [1, 4, 3, 3, 3, 4, 2, 1],
-    [1, 1, 2, 3, 3, 1, 1, 1],
-    [1, 1, 1, 3, 1, 1, 1, 1],
-]
-
-rockScores = [
-    [4, 3, 4, 4, 4, 4, 3, 4],
-    [4, 4, 4, 4, 4, 4, 4, 4],
-    [1, 1, 2, 3, 3, 2, 1, 1],
-    [1, 2, 3, 4, 4, 3, 2, 1],
-    [1, 2, 3, 4, 4, 3, 2, 1],
-    [1, 1, 2, 3, 3, 2, 1, 1],
-    [4, 4, 4, 4, 4, 4, 4, 4],
-    [4, 3, 4, 4, 4, 4, 3, 4],
-]
-
-whitePawnScores = [
-    [8, 8, 8, 8, 8, 8, 8, 8],
-    [8, 8, 8, 8, 8, 8, 8, 8],
-    [5, 6, 6, 7, 7, 6, 6, 5],
-    [2, 3, 3, 5, 5, 3, 3, 2],
-    [1, 2, 3, 4, 4, 3, 2, 1],
-    [1, 1, 2, 3, 3, 2, 1, 1],
-    [1, 1, 1, 0, 0, 1, 1, 1],
-    [0, 0, 0, 0, 0, 0, 0, 0],
-]
-
-blackPawnScores = [
-    [0, 0, 0, 0, 0, 0, 0, 0],
-    [1, 1, 1, 0, 0, 1, 1, 1],
-    [1, 1, 2, 3, 3, 2, 1, 1],
-    [1, 2, 3, 4, 4, 3, 2, 1],
-    [2, 3, 3, 5, 5, 3, 3, 2],
-    [5, 6, 6, 7, 7, 6, 6, 5],
-    [8, 8, 8, 8, 8, 8, 8, 8],
-    [8, 8, 8, 8, 8, 8, 8, 8],
-]
-
-# map eaching of the pieces to the appropriate 2d array
-piecePositionScores = {
-    "N": knightScores,
-    "B": bishopScores,
-    "Q": queenScores,
-    "R": rockScores,
-    "bp": blackPawnScores,
-    "wp": whitePawnScores,
-}
-
-CHECKMATE = 1000
+from chessEngine import GameState, Move
+from moveEncoding import NULL_MOVE
+from evaluation import SCORE_SCALE, computeBoardScore
+from moveOrdering import EXCHANGE_VALUES, MAX_PLY, MoveOrderer, MovePicker, staticExchange
+from openingBook import getDefaultBook
+from searchStats import SearchStats
+from tablebase import DRAW, probe as probeTablebase
+from transpositionTable import EXACT, LOWERBOUND, UPPERBOUND, TranspositionTable
+
+# scores are in tenths of a pawn (see evaluation.SCORE_SCALE)
+CHECKMATE = 10000
 STALEMATE = 0
+# scores beyond this are mates, found by the search or read from the tablebases
+MATE_BOUND = CHECKMATE - 1000
+# when True every scoreBoard() call checks the incremental score against a full recount
+DEBUG_EVAL = False
 # represents how many moves the computer should look ahead
 # before deciding on its best move
 MAX_DEPTH = 3
-nextMove = None
+# how often (in nodes, minus one) the search looks at the clock, the node budget is checked on every node
+CHECK_INTERVAL = 255
+# seconds between two progress info lines of a search with an infoCallback
+INFO_INTERVAL = 1.0
+# worker processes of a ParallelSearch, None means one per cpu
+PARALLEL_WORKERS = None
+# a capture is skipped in the quiescence search when even winning the captured
+# piece plus this margin can't bring the score up to alpha (delta pruning)
+DELTA_MARGIN = 20
+# null-move pruning: how much shallower the search after passing is and the depth it starts at
+NULL_MOVE_REDUCTION = 2
+NULL_MOVE_MIN_DEPTH = 3
+# late move reductions: quiet moves from this index on are searched a ply shallower
+# (two plies from LMR_DEEPER_MOVE_INDEX on) at depths from LMR_MIN_DEPTH on
+LMR_MIN_DEPTH = 3
+LMR_MIN_MOVE_INDEX = 3
+LMR_DEEPER_MOVE_INDEX = 10
+# aspiration windows: from this depth on a depth starts with a window this wide (tenths of a
+# pawn) around the score of the depth before, a score outside it widens that side this many times
+ASPIRATION_MIN_DEPTH = 3
+ASPIRATION_WINDOW = 5
+ASPIRATION_GROWTH = 4
+# play from the opening book (openingBook.DEFAULT_BOOK_PATH) while the position is in it
+USE_BOOK = True
 
 
 """
@@ -101,49 +60,733 @@ def findRandomMoves(validMoves):
 
 """
 this is a helper method to make the first calls
-for the actual algorithm
+for the actual algorithm, it's what chessMain runs in the ai process
 """
 
 
-def findBestMoveMinMax(gs, validMoves, returnQueue):
-    global nextMove
-    nextMove = None
-    findMoveNegaMaxAlphaBeta(
-        gs, validMoves, MAX_DEPTH, -CHECKMATE, CHECKMATE, 1 if gs.whiteToMove else -1
+def findBestMoveMinMax(gs, validMoves, returnQueue, timeLimit=None):
+    bookMove = findBookMove(gs)
+    if bookMove is not None:
+        returnQueue.put(Move.fromCode(bookMove))
+        return
+    result = defaultSearch.iterativeDeepening(
+        gs, MAX_DEPTH, timeLimit=timeLimit, rootMoves=[move.code for move in validMoves]
     )
-    returnQueue.put(nextMove)
-    print(returnQueue.get())
+    returnQueue.put(Move.fromCode(result.bestMove) if result.bestMove is not None else None)
+
+
+"""
+a weighted random move of the opening book, or None when there is no book
+or the position isn't in it and the move has to be searched
+"""
+
+
+def findBookMove(gs):
+    if not USE_BOOK:
+        return None
+    book = getDefaultBook()
+    return book.chooseMove(gs) if book is not None else None
+
+
+class SearchStopped(Exception):
+    pass
 
 
 """
-implementing the nega-max algorithm
+what a search hands back to its caller, moves are packed moves (see moveEncoding)
+and score is from the point of view of the side to move
 """
 
 
-def findMoveNegaMaxAlphaBeta(gs, validMoves, depth, alpha, beta, turnMultiplier):
-    global nextMove
-    if depth == 0:
-        return turnMultiplier * scoreBoard(gs)
-    # move ordering - could improve the algorithm a little bit
-    # random.shuffle(validMoves)
-    maxScore = -CHECKMATE
-    for move in validMoves:
-        gs.makeMove(move)
-        nextMoves = gs.getValidMoves()
-        score = -findMoveNegaMaxAlphaBeta(
-            gs, nextMoves, depth - 1, -beta, -alpha, -turnMultiplier
+class SearchResult:
+    def __init__(self, bestMove, score, depth, pv, nodes, seconds, cutoffs=0, firstMoveCutoffs=0, stats=None):
+        self.bestMove = bestMove
+        self.score = score
+        self.depth = depth  # the last depth that was searched completely
+        self.pv = pv
+        self.nodes = nodes
+        self.seconds = seconds
+        # how many beta cutoffs there were and how many came from the first move tried,
+        # the closer the two are the better the move ordering works
+        self.cutoffs = cutoffs
+        self.firstMoveCutoffs = firstMoveCutoffs
+        # a SearchStats when the search collected them, otherwise None
+        self.stats = stats
+
+    def firstMoveCutoffRate(self):
+        return self.firstMoveCutoffs / self.cutoffs if self.cutoffs else 0.0
+
+    """
+    the result as an engine "info" line: score in centipawns or as moves to mate,
+    time in milliseconds and the pv in coordinate notation
+    """
+
+    def infoLine(self):
+        if abs(self.score) >= MATE_BOUND:
+            plies = CHECKMATE - abs(self.score)
+            score = "mate %d" % ((plies + 1) // 2 if self.score > 0 else -((plies + 1) // 2))
+        else:
+            score = "cp %d" % (self.score * 100 // SCORE_SCALE)
+        milliseconds = int(self.seconds * 1000)
+        return "depth %d score %s nodes %d nps %d time %d pv %s" % (
+            self.depth,
+            score,
+            self.nodes,
+            self.nodes * 1000 // max(milliseconds, 1),
+            milliseconds,
+            " ".join(Move.fromCode(move).getChessNotation() for move in self.pv),
+        )
+
+    def __str__(self):
+        pv = " ".join(str(Move.fromCode(move)) for move in self.pv)
+        return "depth %d score %d nodes %d time %.2fs first move cutoffs %.1f%% pv %s" % (
+            self.depth,
+            self.score,
+            self.nodes,
+            self.seconds,
+            self.firstMoveCutoffRate() * 100,
+            pv,
+        )
+
+
+"""
+holds everything a search needs between nodes and between moves of a game,
+so nothing is kept in module globals anymore
+"""
+
+
+class Search:
+    def __init__(
+        self,
+        transpositionTable=None,
+        useMoveOrdering=True,
+        useQuiescence=True,
+        collectStats=False,
+        infoCallback=None,
+        infoInterval=INFO_INTERVAL,
+        stopCheck=None,
+        useTablebases=True,
+        useNullMove=True,
+        useLateMoveReductions=True,
+    ):
+        self.transpositionTable = transpositionTable or TranspositionTable()
+        self.moveOrderer = MoveOrderer()
+        # without ordering only the hash move goes first, useful to measure what ordering buys
+        self.useMoveOrdering = useMoveOrdering
+        # without quiescence the leaves are scored as they are, even in the middle of an exchange
+        self.useQuiescence = useQuiescence
+        # a fresh SearchStats for every search when collectStats is set, None otherwise
+        self.collectStats = collectStats
+        self.stats = None
+        # called with an info line after every finished depth and, while a depth
+        # runs, every infoInterval seconds with the nodes searched so far
+        self.infoCallback = infoCallback
+        self.infoInterval = infoInterval
+        # called along with the other limit checks, the search stops when it returns True;
+        # unlike stop() it can't be lost by a search that starts after it was asked
+        self.stopCheck = stopCheck
+        # positions with three pieces or less are looked up in the tablebases (when generated)
+        self.useTablebases = useTablebases
+        # selective search, both can be turned off to measure what they buy
+        self.useNullMove = useNullMove
+        self.useLateMoveReductions = useLateMoveReductions
+        self.startTime = 0.0
+        self.nextInfoTime = None
+        self.nodes = 0
+        self.cutoffs = 0
+        self.firstMoveCutoffs = 0
+        self.deadline = None
+        self.nodeLimit = None
+        self.stopped = False
+        self.rootBestMove = None
+        self.rootScores = {}
+        # the root moves in the order the last iterativeDeepening() left them, best first
+        self.rootMoves = []
+        # triangular pv table: pvTable[ply][ply:pvLength[ply]] is the best line found from ply on
+        self.pvTable = [[None] * (MAX_PLY + 1) for _ in range(MAX_PLY + 1)]
+        self.pvLength = [0] * (MAX_PLY + 1)
+
+    def stop(self):
+        # can be called from another thread, the search notices at its next check
+        self.stopped = True
+
+    """
+    forgets everything learned in earlier searches, for the start of a new game
+    """
+
+    def newGame(self):
+        self.transpositionTable.clear()
+        self.moveOrderer = MoveOrderer()
+
+    def checkLimits(self):
+        if self.nextInfoTime is not None:
+            now = time.perf_counter()
+            if now >= self.nextInfoTime:
+                self.nextInfoTime = now + self.infoInterval
+                milliseconds = int((now - self.startTime) * 1000)
+                nps = self.nodes * 1000 // max(milliseconds, 1)
+                self.infoCallback("nodes %d nps %d time %d" % (self.nodes, nps, milliseconds))
+        if self.stopped:
+            raise SearchStopped()
+        if self.stopCheck is not None and self.stopCheck():
+            raise SearchStopped()
+        if self.deadline is not None and time.perf_counter() >= self.deadline:
+            raise SearchStopped()
+
+    """
+    searches depth 1, 2, ... maxDepth and stops early when timeLimit (seconds) or
+    nodeLimit runs out, the moves of the depth that was still running are thrown
+    away and the best move of the last finished depth is returned; every depth
+    starts with the previous best move and keeps the rest of the root moves in
+    the order of their previous scores, the rest of the previous pv is tried first
+    through the transposition table. from ASPIRATION_MIN_DEPTH on a depth is first
+    searched with a narrow window around the previous score, and again with the
+    failing side of the window widened whenever the score falls outside of it
+    """
+
+    def iterativeDeepening(self, gs, maxDepth=MAX_DEPTH, timeLimit=None, nodeLimit=None, rootMoves=None):
+        start = time.perf_counter()
+        self.nodes = 0
+        self.cutoffs = 0
+        self.firstMoveCutoffs = 0
+        self.stats = SearchStats() if self.collectStats else None
+        self.startTime = start
+        self.nextInfoTime = start + self.infoInterval if self.infoCallback is not None else None
+        self.deadline = start + timeLimit if timeLimit is not None else None
+        self.nodeLimit = nodeLimit
+        self.stopped = False
+        self.rootBestMove = None
+        self.rootMoves = []
+        self.transpositionTable.newSearch()
+        self.moveOrderer.newSearch()
+        if rootMoves is None:
+            rootMoves = gs.getValidMoveCodes()
+        else:
+            rootMoves = list(rootMoves)
+        if self.useTablebases and rootMoves and gs.pieceCount <= 3:
+            result = self.tablebaseMove(gs, rootMoves)
+            if result is not None:
+                result.seconds = time.perf_counter() - start
+                if self.infoCallback is not None:
+                    self.infoCallback(result.infoLine())
+                return result
+        turnMultiplier = 1 if gs.whiteToMove else -1
+        result = SearchResult(rootMoves[0] if rootMoves else None, 0, 0, [], 0, 0.0)
+        if not rootMoves:  # checkmate or stalemate, there's nothing to search
+            result.seconds = time.perf_counter() - start
+            return result
+        movesOnBoard = len(gs.moveCodeLog)
+        score = 0
+        for depth in range(1, maxDepth + 1):
+            window = ASPIRATION_WINDOW
+            if depth >= ASPIRATION_MIN_DEPTH and abs(score) < MATE_BOUND:
+                alpha, beta = score - window, score + window
+            else:
+                alpha, beta = -CHECKMATE, CHECKMATE
+            try:
+                while True:
+                    self.rootScores = {}
+                    score = self.findMoveNegaMaxAlphaBeta(gs, rootMoves, depth, alpha, beta, turnMultiplier, 0)
+                    if -CHECKMATE < alpha and score <= alpha:
+                        window *= ASPIRATION_GROWTH
+                        alpha = max(score - window, -CHECKMATE)
+                    elif score >= beta and beta < CHECKMATE:
+                        window *= ASPIRATION_GROWTH
+                        beta = min(score + window, CHECKMATE)
+                    else:
+                        break
+                    if self.stats is not None:
+                        self.stats.aspirationReSearches += 1
+            except SearchStopped:
+                # unwind whatever the search still had on the board
+                while len(gs.moveCodeLog) > movesOnBoard:
+                    if gs.moveCodeLog[-1] == NULL_MOVE:
+                        gs.undoNullMove()
+                    else:
+                        gs.undoMoveCode()
+                break
+            if self.rootBestMove is None:
+                break
+            rootMoves.sort(key=lambda move: -self.rootScores.get(move, -CHECKMATE))
+            rootMoves.sort(key=lambda move: move != self.rootBestMove)
+            self.rootMoves = rootMoves
+            pv = self.pvTable[0][: self.pvLength[0]]
+            if not pv or pv[0] != self.rootBestMove:
+                pv = [self.rootBestMove]
+            # a transposition table cutoff ends the line early, the table can carry it on
+            for move in pv:
+                gs.makeMoveCode(move)
+            tail = self.principalVariation(gs, depth - len(pv))
+            for _ in pv:
+                gs.undoMoveCode()
+            pv += tail
+            result = SearchResult(
+                self.rootBestMove,
+                score,
+                depth,
+                pv,
+                self.nodes,
+                time.perf_counter() - start,
+            )
+            if self.infoCallback is not None:
+                self.infoCallback(result.infoLine())
+            if abs(score) >= CHECKMATE - maxDepth:  # found a forced mate, no need to go deeper
+                break
+        result.nodes = self.nodes
+        result.seconds = time.perf_counter() - start
+        result.cutoffs = self.cutoffs
+        result.firstMoveCutoffs = self.firstMoveCutoffs
+        result.stats = self.stats
+        return result
+
+    """
+    picks the root move straight from the tablebases: the quickest mate when
+    winning, the slowest when losing; None when any of the positions after
+    the root moves has no table
+    """
+
+    def tablebaseMove(self, gs, rootMoves):
+        if probeTablebase(gs) is None:
+            return None
+        bestMove = None
+        bestScore = -CHECKMATE
+        for move in rootMoves:
+            gs.makeMoveCode(move)
+            value = probeTablebase(gs)
+            gs.undoMoveCode()
+            if value is None:
+                return None
+            score = -tablebaseScore(value, 1)
+            if score > bestScore:
+                bestScore = score
+                bestMove = move
+        return SearchResult(bestMove, bestScore, 1, [bestMove], len(rootMoves), 0.0)
+
+    def principalVariation(self, gs, depth):
+        # follows the best moves stored in the transposition table, for searches
+        # that didn't run through this Search's pv table
+        pv = []
+        for _ in range(depth):
+            entry = self.transpositionTable.probe(gs.zobristKey)
+            if entry is None or entry[3] is None or entry[3] not in gs.getValidMoveCodes():
+                break
+            pv.append(entry[3])
+            gs.makeMoveCode(entry[3])
+        for _ in pv:
+            gs.undoMoveCode()
+        return pv
+
+    """
+    implementing the nega-max algorithm as a principal variation search: the first
+    move gets the full window, the rest are only tested against alpha with a null
+    window and searched again with the full window when one of them beats it;
+    validMoves is a list of the legal packed moves (see moveEncoding), like the root moves,
+    or None to have a MovePicker generate them only as they're needed; ply is the distance
+    from the root and allowNull is False right after a null move so the side to move can't
+    pass twice in a row
+    """
+
+    def findMoveNegaMaxAlphaBeta(self, gs, validMoves, depth, alpha, beta, turnMultiplier, ply, allowNull=True):
+        if self.nodeLimit is not None and self.nodes >= self.nodeLimit:
+            raise SearchStopped()
+        self.nodes += 1
+        if self.nodes & CHECK_INTERVAL == 0:
+            self.checkLimits()
+        stats = self.stats
+        if stats is not None:
+            stats.nodes += 1
+        self.pvLength[ply] = ply
+        if validMoves is not None and not validMoves:
+            # prefer the quicker mate
+            return -CHECKMATE + ply if gs.checkmate else STALEMATE
+        # a repeated position or the fifty-move rule ends the line in a draw, whatever comes after
+        if ply > 0 and (gs.isRepetition() or gs.isFiftyMoveDraw()):
+            return STALEMATE
+        if gs.pieceCount <= 3 and self.useTablebases:
+            value = probeTablebase(gs)
+            if value is not None:
+                if stats is not None:
+                    stats.tablebaseHits += 1
+                return tablebaseScore(value, ply)
+        if depth == 0:
+            if self.useQuiescence:
+                return self.quiescence(gs, alpha, beta, turnMultiplier, ply)
+            if stats is not None:
+                return turnMultiplier * stats.evaluate(scoreBoard, gs)
+            return turnMultiplier * scoreBoard(gs)
+        alphaOrig = alpha
+        hashMove = None
+        entry = self.transpositionTable.probe(gs.zobristKey)
+        if stats is not None:
+            stats.ttProbes += 1
+        if entry is not None:
+            entryDepth, entryScore, entryFlag, hashMove, _ = entry
+            entryScore = scoreFromTable(entryScore, ply)
+            if stats is not None:
+                stats.ttHits += 1
+            # the root always has to be searched so it has a best move
+            if entryDepth >= depth and ply > 0:
+                if entryFlag == EXACT:
+                    if stats is not None:
+                        stats.ttCutoffs += 1
+                    return entryScore
+                elif entryFlag == LOWERBOUND:
+                    alpha = max(alpha, entryScore)
+                else:
+                    beta = min(beta, entryScore)
+                if alpha >= beta:
+                    if stats is not None:
+                        stats.ttCutoffs += 1
+                    return entryScore
+        if validMoves is None:
+            validMoves = MovePicker(gs, self.moveOrderer if self.useMoveOrdering else None, hashMove, ply, stats)
+            inCheck = validMoves.inCheck
+        else:
+            inCheck = ply > 0 and depth >= min(NULL_MOVE_MIN_DEPTH, LMR_MIN_DEPTH) and gs.inCheck()
+            # move ordering, the root moves are already ordered by iterativeDeepening()
+            if ply > 0:
+                if self.useMoveOrdering:
+                    validMoves = self.moveOrderer.orderMoves(validMoves, hashMove, ply)
+                elif hashMove is not None:
+                    validMoves = sorted(validMoves, key=lambda m: m != hashMove)
+        if (
+            self.useNullMove
+            and allowNull
+            and ply > 0
+            and not inCheck
+            and depth >= NULL_MOVE_MIN_DEPTH
+            and beta < CHECKMATE - MAX_PLY
+            and self.nullMoveCutoff(gs, depth, beta, turnMultiplier, ply)
+        ):
+            return beta
+        reduceLateMoves = self.useLateMoveReductions and ply > 0 and depth >= LMR_MIN_DEPTH and not inCheck
+        maxScore = -CHECKMATE
+        bestMove = None
+        for moveIndex, move in enumerate(validMoves):
+            gs.makeMoveCode(move)
+            if moveIndex == 0:
+                score = -self.findMoveNegaMaxAlphaBeta(
+                    gs, None, depth - 1, -beta, -alpha, -turnMultiplier, ply + 1
+                )
+            else:
+                reduction = 0
+                # quiet moves that come late in the ordering rarely turn out best, unless they give check
+                if (
+                    reduceLateMoves
+                    and moveIndex >= LMR_MIN_MOVE_INDEX
+                    and not move >> 14 & 255
+                    and not gs.inCheck()
+                ):
+                    reduction = 2 if moveIndex >= LMR_DEEPER_MOVE_INDEX and depth > LMR_MIN_DEPTH else 1
+                    if stats is not None:
+                        stats.reductions += 1
+                score = -self.findMoveNegaMaxAlphaBeta(
+                    gs, None, depth - 1 - reduction, -alpha - 1, -alpha, -turnMultiplier, ply + 1
+                )
+                if score > alpha and reduction:  # it may be good after all, test it again at full depth
+                    if stats is not None:
+                        stats.reSearches += 1
+                    score = -self.findMoveNegaMaxAlphaBeta(
+                        gs, None, depth - 1, -alpha - 1, -alpha, -turnMultiplier, ply + 1
+                    )
+                if alpha < score < beta:  # better than the first move, get its real score
+                    if stats is not None:
+                        stats.reSearches += 1
+                    score = -self.findMoveNegaMaxAlphaBeta(
+                        gs, None, depth - 1, -beta, -alpha, -turnMultiplier, ply + 1
+                    )
+            gs.undoMoveCode()
+            if ply == 0:
+                self.rootScores[move] = score
+            if score > maxScore:
+                maxScore = score
+                bestMove = move
+                if ply == 0:
+                    self.rootBestMove = move
+            if maxScore > alpha:  # where the prunning happens
+                alpha = maxScore
+                # the new best line is this move followed by the best line of the reply
+                nextLength = self.pvLength[ply + 1]
+                pvRow = self.pvTable[ply]
+                pvRow[ply] = move
+                pvRow[ply + 1 : nextLength] = self.pvTable[ply + 1][ply + 1 : nextLength]
+                self.pvLength[ply] = nextLength
+            if alpha >= beta:
+                self.cutoffs += 1
+                if moveIndex == 0:
+                    self.firstMoveCutoffs += 1
+                if stats is not None:
+                    stats.cutoff(moveIndex)
+                if self.useMoveOrdering:
+                    self.moveOrderer.recordCutoff(move, depth, ply)
+                break
+        if bestMove is None:  # the picker had no legal move
+            return -CHECKMATE + ply if inCheck else STALEMATE
+        if maxScore <= alphaOrig:
+            flag = UPPERBOUND
+        elif maxScore >= beta:
+            flag = LOWERBOUND
+        else:
+            flag = EXACT
+        self.transpositionTable.store(gs.zobristKey, depth, scoreToTable(maxScore, ply), flag, bestMove)
+        return maxScore
+
+    """
+    passes the turn and searches the opponent's reply with a null window a
+    NULL_MOVE_REDUCTION shallower: when the side to move is still at or above
+    beta after giving the opponent a free move, a real move will do at least as
+    well and the node is cut. that breaks down in zugzwang, where every real
+    move is worse than passing, which mostly happens once only pawns are left;
+    there a fail high is verified by a search of the real moves at the
+    reduced depth before the node is cut
+    """
+
+    def nullMoveCutoff(self, gs, depth, beta, turnMultiplier, ply):
+        stats = self.stats
+        if stats is not None:
+            stats.nullMoveTries += 1
+        gs.makeNullMove()
+        score = -self.findMoveNegaMaxAlphaBeta(
+            gs, None, depth - 1 - NULL_MOVE_REDUCTION, -beta, -beta + 1, -turnMultiplier, ply + 1, False
         )
-        if score > maxScore:
-            maxScore = score
-            if depth == MAX_DEPTH:
-                nextMove = move
-                print(move, score)
-        gs.undoMove()
-        if maxScore > alpha:  # where the prunning happens
-            alpha = maxScore
-        if alpha >= beta:
-            break
-    return maxScore
+        gs.undoNullMove()
+        if score < beta:
+            return False
+        if hasOnlyPawns(gs):
+            score = self.findMoveNegaMaxAlphaBeta(
+                gs, None, depth - NULL_MOVE_REDUCTION, beta - 1, beta, turnMultiplier, ply, False
+            )
+            if score < beta:
+                return False
+        if stats is not None:
+            stats.nullMoveCutoffs += 1
+        return True
+
+    """
+    keeps searching the captures and promotions past the horizon until the
+    position is quiet, so the leaves aren't scored halfway through an exchange;
+    the side to move can always stand pat on the static score instead of capturing,
+    except in check where every evasion is searched
+    """
+
+    def quiescence(self, gs, alpha, beta, turnMultiplier, ply):
+        if self.nodeLimit is not None and self.nodes >= self.nodeLimit:
+            raise SearchStopped()
+        self.nodes += 1
+        if self.nodes & CHECK_INTERVAL == 0:
+            self.checkLimits()
+        stats = self.stats
+        if stats is not None:
+            stats.quiescenceNodes += 1
+        if gs.inCheck():
+            if stats is None:
+                moves = gs.getValidMoveCodes()
+            else:
+                moves = stats.generate(gs.getValidMoveCodes)
+            if not moves:
+                return -CHECKMATE + ply
+            maxScore = -CHECKMATE
+            standPat = None
+        else:
+            if stats is None:
+                standPat = turnMultiplier * scoreBoard(gs)
+            else:
+                standPat = turnMultiplier * stats.evaluate(scoreBoard, gs)
+            if standPat >= beta:
+                return standPat
+            if standPat > alpha:
+                alpha = standPat
+            if stats is None:
+                moves = gs.getCaptureMoveCodes()
+            else:
+                moves = stats.generateCaptures(gs.getCaptureMoveCodes)
+            maxScore = standPat
+        for move in self.moveOrderer.orderMoves(moves, None, ply):
+            if standPat is not None:
+                gain = EXCHANGE_VALUES[move >> 18 & 15]
+                promotion = move >> 14 & 15
+                if promotion:
+                    gain += EXCHANGE_VALUES[promotion]
+                if standPat + gain + DELTA_MARGIN <= alpha:
+                    continue
+                if EXCHANGE_VALUES[move >> 22 & 15] > gain and staticExchange(gs, move) < 0:
+                    continue
+            gs.makeMoveCode(move)
+            score = -self.quiescence(gs, -beta, -alpha, -turnMultiplier, ply + 1)
+            gs.undoMoveCode()
+            if score > maxScore:
+                maxScore = score
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        break
+        return maxScore
+
+
+"""
+True when the side to move has nothing but its king and pawns
+"""
+
+
+def hasOnlyPawns(gs):
+    color = "w" if gs.whiteToMove else "b"
+    for row in gs.board:
+        for piece in row:
+            if piece[0] == color and piece[1] in "NBRQ":
+                return False
+    return True
+
+
+"""
+a tablebase value as a search score at this ply, mates are counted from the
+root like the ones the search finds itself
+"""
+
+
+def tablebaseScore(value, ply):
+    if value == DRAW:
+        return STALEMATE
+    if value > 0:
+        return CHECKMATE - (ply + value - 1)
+    return -CHECKMATE + ply - value - 1
+
+
+"""
+a mate score as it goes into the transposition table, counted from this node
+instead of the root so it still holds when the position is reached at another ply
+"""
+
+
+def scoreToTable(score, ply):
+    if score >= MATE_BOUND:
+        return score + ply
+    if score <= -MATE_BOUND:
+        return score - ply
+    return score
+
+
+"""
+a transposition table score read at this ply, undoes scoreToTable()
+"""
+
+
+def scoreFromTable(score, ply):
+    if score >= MATE_BOUND:
+        return score - ply
+    if score <= -MATE_BOUND:
+        return score + ply
+    return score
+
+
+# shared between searches so later moves can reuse what was already found
+defaultSearch = Search()
+
+
+"""
+splits the root moves of the last depth across a pool of worker processes:
+the shallower depths run first in this process to order the root moves, then
+the best of them is searched here at full width so the workers start with a
+real alpha (young brothers wait) and the rest is handed out one move at a time;
+the workers share alpha through a multiprocessing.Value so every root move is
+searched against the best score any of them has found so far.
+there are no time or node limits, the workers always finish their depth
+"""
+
+
+class ParallelSearch:
+    def __init__(self, workers=PARALLEL_WORKERS):
+        self.workers = workers or os.cpu_count() or 1
+        self.search = Search()
+        self.sharedAlpha = multiprocessing.Value("i", -CHECKMATE)
+        self.pool = None
+        self.searchId = 0
+
+    def start(self):
+        if self.pool is None:
+            self.pool = multiprocessing.Pool(
+                self.workers, initializer=initWorker, initargs=(self.sharedAlpha,)
+            )
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
+
+    def iterativeDeepening(self, gs, maxDepth=MAX_DEPTH, rootMoves=None):
+        start = time.perf_counter()
+        if maxDepth < 2 or self.workers < 2:
+            return self.search.iterativeDeepening(gs, maxDepth, rootMoves=rootMoves)
+        result = self.search.iterativeDeepening(gs, maxDepth - 1, rootMoves=rootMoves)
+        rootMoves = self.search.rootMoves
+        if len(rootMoves) < 2 or abs(result.score) >= CHECKMATE - maxDepth:
+            return result
+        self.start()
+        turnMultiplier = 1 if gs.whiteToMove else -1
+        bestMove = rootMoves[0]
+        gs.makeMoveCode(bestMove)
+        bestScore = -self.search.findMoveNegaMaxAlphaBeta(
+            gs, None, maxDepth - 1, -CHECKMATE, CHECKMATE, -turnMultiplier, 1
+        )
+        gs.undoMoveCode()
+        nodes = self.search.nodes
+        self.sharedAlpha.value = bestScore
+        self.searchId += 1
+        packed, recentMoves = gs.recentHistory()
+        useBitboards = gs.bitboards is not None
+        tasks = [(self.searchId, packed, recentMoves, useBitboards, move, maxDepth) for move in rootMoves[1:]]
+        for move, score, exact, moveNodes in self.pool.imap_unordered(searchRootMove, tasks):
+            nodes += moveNodes
+            if exact and score > bestScore:
+                bestScore = score
+                bestMove = move
+        gs.makeMoveCode(bestMove)
+        pv = [bestMove] + self.search.principalVariation(gs, maxDepth - 1)
+        gs.undoMoveCode()
+        return SearchResult(bestMove, bestScore, maxDepth, pv, nodes, time.perf_counter() - start)
+
+
+# set up in every worker process of a ParallelSearch by initWorker()
+workerSearch = None
+workerAlpha = None
+workerSearchId = None
+
+
+def initWorker(sharedAlpha):
+    global workerSearch, workerAlpha
+    workerSearch = Search()
+    workerAlpha = sharedAlpha
+
+
+"""
+searches one root move in a worker process, the position is rebuilt from
+GameState.recentHistory() so the task stays small however long the game is;
+a move that doesn't beat the shared alpha only gets an upper bound as its
+score and comes back with exact False so the caller skips it
+"""
+
+
+def searchRootMove(task):
+    global workerSearchId
+    searchId, packed, recentMoves, useBitboards, move, depth = task
+    if searchId != workerSearchId:
+        workerSearchId = searchId
+        workerSearch.transpositionTable.newSearch()
+        workerSearch.moveOrderer.newSearch()
+    gs = GameState.fromBytes(packed, useBitboards)
+    for playedMove in recentMoves:
+        gs.makeMoveCode(playedMove)
+    turnMultiplier = 1 if gs.whiteToMove else -1
+    workerSearch.nodes = 0
+    alpha = workerAlpha.value
+    gs.makeMoveCode(move)
+    score = -workerSearch.findMoveNegaMaxAlphaBeta(gs, None, depth - 1, -CHECKMATE, -alpha, -turnMultiplier, 1)
+    exact = score > alpha
+    if exact:
+        with workerAlpha.get_lock():
+            if score > workerAlpha.value:
+                workerAlpha.value = score
+    return move, score, exact, workerSearch.nodes
 
 
 """
@@ -164,22 +807,7 @@ def scoreBoard(gs):
             return CHECKMATE  # white wins
     elif gs.stalemate:
         return STALEMATE
-    score = 0
-    for row in range(len(gs.board)):
-        for col in range(len(gs.board[row])):
-            square = gs.board[row][col]
-            if square != "--":
-                pps = 0
-                fac = 0.1
-                color = square[0]
-                piece = square[1]
-                if piece != "K":
-                    pps += (
-                        piecePositionScores[piece if piece != "p" else square][row][col]
-                        * fac
-                    )
-                if color == "w":
-                    score += pieceScore[piece] + pps
-                elif color == "b":
-                    score -= pieceScore[piece] + pps
-    return score
\ No newline at end of file
+    if DEBUG_EVAL:
+        fullScore = computeBoardScore(gs.board)
+        assert gs.boardScore == fullScore, (gs.boardScore, fullScore)
+    return gs.boardScore
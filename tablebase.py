@@ -0,0 +1,257 @@
+"""
+endgame tablebases for king and queen, king and rook and king and pawn against
+a lone king, generated on this machine by retrograde analysis with the move
+rules of chessEngine and probed by the search so these endings are played
+perfectly instead of shuffled around at depth 3.
+
+every table is stored with the strong side as white (a black queen, rook or
+pawn is probed on the board mirrored top to bottom) in one file of
+tablebases/<material>.tb: a small header and then one signed byte per position
+at index ((blackToMove * 64 + white king) * 64 + black king) * 64 + piece,
+squares counted like everywhere else (a8 = 0):
+ 0   a draw (or a position that can't happen)
+ n   the side to move mates in n - 1 plies
+ -n  the side to move is mated in n - 1 plies
+
+generate the tables (KPK needs KQK and KRK, so they are made in this order):
+  python tablebase.py [KQK KRK KPK]
+"""
+
+import os
+import struct
+import sys
+import time
+from array import array
+
+from chessEngine import GameState
+from moveEncoding import PIECE_NAMES
+
+MAGIC = b"CETB"
+HEADER = struct.Struct(">4s3sI")
+TABLEBASE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tablebases")
+MATERIALS = ("KQK", "KRK", "KPK")
+TABLE_SIZE = 2 * 64 * 64 * 64
+DRAW = 0
+
+# tables loaded so far, None for the ones that haven't been generated
+loadedTables = {}
+
+
+def tableIndex(blackToMove, whiteKing, blackKing, square):
+    return ((blackToMove * 64 + whiteKing) * 64 + blackKing) * 64 + square
+
+
+def tablePath(material):
+    return os.path.join(TABLEBASE_DIR, material + ".tb")
+
+
+def loadTable(material):
+    if material not in loadedTables:
+        table = None
+        path = tablePath(material)
+        if os.path.exists(path):
+            with open(path, "rb") as tableFile:
+                data = tableFile.read()
+            if len(data) < HEADER.size:
+                raise ValueError("%s is not a %s tablebase" % (path, material))
+            magic, name, size = HEADER.unpack_from(data, 0)
+            if magic != MAGIC or name != material.encode() or size != len(data) - HEADER.size:
+                raise ValueError("%s is not a %s tablebase" % (path, material))
+            table = array("b")
+            table.frombytes(data[HEADER.size :])
+        loadedTables[material] = table
+    return loadedTables[material]
+
+
+def saveTable(material, table):
+    os.makedirs(TABLEBASE_DIR, exist_ok=True)
+    with open(tablePath(material), "wb") as tableFile:
+        tableFile.write(HEADER.pack(MAGIC, material.encode(), len(table)))
+        tableFile.write(table.tobytes())
+    loadedTables[material] = table
+
+
+"""
+the table value (see above) of the position for the side to move, DRAW for
+bare kings and a lone bishop or knight, None when the position has more pieces,
+castling rights or a table that hasn't been generated or can't be read
+"""
+
+
+def probe(gs):
+    if gs.pieceCount > 3 or gs.currentCastlingRights:
+        return None
+    piece = None
+    square = 0
+    for r, row in enumerate(gs.board):
+        for c, boardPiece in enumerate(row):
+            if boardPiece != "--" and boardPiece[1] != "K":
+                piece = boardPiece
+                square = r * 8 + c
+    if piece is None or piece[1] in "BN":
+        return DRAW
+    whiteKing = gs.whiteKingLocation[0] * 8 + gs.whiteKingLocation[1]
+    blackKing = gs.blackKingLocation[0] * 8 + gs.blackKingLocation[1]
+    blackToMove = 0 if gs.whiteToMove else 1
+    if piece[0] == "b":
+        # flip the board so the strong side is white
+        whiteKing, blackKing, square = blackKing ^ 56, whiteKing ^ 56, square ^ 56
+        blackToMove ^= 1
+    material = "K" + piece[1].upper() + "K"
+    try:
+        table = loadTable(material)
+    except ValueError:
+        # a broken table file is left alone like a missing one instead of stopping the search
+        loadedTables[material] = None
+        return None
+    if table is None:
+        return None
+    return table[tableIndex(blackToMove, whiteKing, blackKing, square)]
+
+
+"""
+builds one table by retrograde analysis: every legal position gets its moves
+from chessEngine, moves that leave the table (captures to bare kings, promotions)
+are looked up right away, the rest become edges between positions. from the
+mates outwards, a position with a move into a lost position is won one ply
+later than the quickest such loss, and a position whose moves all lead into
+won positions is lost one ply later than the slowest such win; whatever is
+left at the end is a draw
+"""
+
+
+def generateTable(material):
+    strongPiece = "w" + material[1].replace("P", "p")
+    isPawn = strongPiece == "wp"
+    values = array("b", bytes(TABLE_SIZE))
+    resolved = bytearray(TABLE_SIZE)
+    # moves into positions of the table that aren't known to be won for the opponent yet
+    openMoves = bytearray(TABLE_SIZE)
+    # a move out of the table that draws, or wins
+    drawingExit = bytearray(TABLE_SIZE)
+    winningExit = bytearray(TABLE_SIZE)
+    longestLoss = bytearray(TABLE_SIZE)
+    edgeFrom = array("I")
+    edgeTo = array("I")
+    # buckets[d] holds the positions that are won (index * 2 + 1) or lost (index * 2) in d plies
+    buckets = [[]]
+
+    def push(distance, entry):
+        while len(buckets) <= distance:
+            buckets.append([])
+        buckets[distance].append(entry)
+
+    gs = GameState(fen="8/8/8/8/8/8/8/8 w - - 0 1")
+    board = gs.board
+    for whiteKing in range(64):
+        for blackKing in range(64):
+            if max(abs((whiteKing >> 3) - (blackKing >> 3)), abs((whiteKing & 7) - (blackKing & 7))) < 2:
+                continue
+            for square in range(64):
+                if square == whiteKing or square == blackKing or (isPawn and square >> 3 in (0, 7)):
+                    continue
+                for row in board:
+                    row[:] = ["--"] * 8
+                board[whiteKing >> 3][whiteKing & 7] = "wK"
+                board[blackKing >> 3][blackKing & 7] = "bK"
+                board[square >> 3][square & 7] = strongPiece
+                gs.whiteKingLocation = (whiteKing >> 3, whiteKing & 7)
+                gs.blackKingLocation = (blackKing >> 3, blackKing & 7)
+                for blackToMove in (0, 1):
+                    gs.whiteToMove = blackToMove == 1
+                    if gs.inCheck():  # the side that just moved left its king in check
+                        continue
+                    gs.whiteToMove = blackToMove == 0
+                    index = tableIndex(blackToMove, whiteKing, blackKing, square)
+                    moves = gs.getValidMoveCodes()
+                    if not moves:
+                        if gs.checkmate:
+                            push(0, index * 2)
+                        else:
+                            resolved[index] = 1  # stalemate
+                        continue
+                    for move in moves:
+                        endSq = move >> 6 & 63
+                        promotion = move >> 14 & 15
+                        if move >> 18 & 15 or (promotion and PIECE_NAMES[promotion][1] in "BN"):
+                            drawingExit[index] = 1
+                            continue
+                        if promotion:
+                            table = loadTable("K" + PIECE_NAMES[promotion][1] + "K")
+                            value = table[tableIndex(1, whiteKing, blackKing, endSq)]
+                            if value == DRAW:
+                                drawingExit[index] = 1
+                            elif value < 0:
+                                winningExit[index] = 1
+                                push(-value, index * 2 + 1)
+                            else:
+                                longestLoss[index] = max(longestLoss[index], value)
+                            continue
+                        pieceMoved = PIECE_NAMES[move >> 22 & 15]
+                        if pieceMoved == "wK":
+                            target = tableIndex(1, endSq, blackKing, square)
+                        elif pieceMoved == "bK":
+                            target = tableIndex(0, whiteKing, endSq, square)
+                        else:
+                            target = tableIndex(1, whiteKing, blackKing, endSq)
+                        edgeFrom.append(index)
+                        edgeTo.append(target)
+                        openMoves[index] += 1
+                    if not openMoves[index] and not drawingExit[index] and not winningExit[index]:
+                        push(longestLoss[index], index * 2)
+
+    # the moves into every position, sorted by target so they can be walked backwards
+    predecessorStart = array("I", bytes(4 * (TABLE_SIZE + 1)))
+    for target in edgeTo:
+        predecessorStart[target + 1] += 1
+    for index in range(TABLE_SIZE):
+        predecessorStart[index + 1] += predecessorStart[index]
+    predecessors = array("I", bytes(4 * len(edgeTo)))
+    fill = array("I", predecessorStart)
+    for source, target in zip(edgeFrom, edgeTo):
+        predecessors[fill[target]] = source
+        fill[target] += 1
+    del edgeFrom, edgeTo, fill
+
+    distance = 0
+    while distance < len(buckets):
+        for entry in buckets[distance]:
+            index = entry >> 1
+            if resolved[index]:
+                continue
+            resolved[index] = 1
+            won = entry & 1
+            values[index] = distance + 1 if won else -(distance + 1)
+            for p in range(predecessorStart[index], predecessorStart[index + 1]):
+                predecessor = predecessors[p]
+                if resolved[predecessor]:
+                    continue
+                if not won:
+                    push(distance + 1, predecessor * 2 + 1)
+                    continue
+                openMoves[predecessor] -= 1
+                if longestLoss[predecessor] < distance + 1:
+                    longestLoss[predecessor] = distance + 1
+                if not openMoves[predecessor] and not drawingExit[predecessor] and not winningExit[predecessor]:
+                    push(longestLoss[predecessor], predecessor * 2)
+        distance += 1
+    return values
+
+
+def main():
+    for material in sys.argv[1:] or MATERIALS:
+        if material not in MATERIALS:
+            sys.exit("unknown material %s, choose from %s" % (material, " ".join(MATERIALS)))
+        start = time.perf_counter()
+        table = generateTable(material)
+        saveTable(material, table)
+        won = sum(1 for value in table if value > 0)
+        longest = max(table) - 1
+        print(
+            "%s: %d won positions, longest mate %d plies, %.1fs"
+            % (material, won, longest, time.perf_counter() - start)
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+import unittest
+
+from chessEngine import GameState
+from smartMoveFinder import CHECKMATE, Search, SearchResult, scoreFromTable, scoreToTable
+
+# black to move, mated in 4 plies by the two rooks
+KRRK_FEN = "7k/R7/8/8/8/8/8/4K2R b - - 1 1"
+
+
+class MateScoreTest(unittest.TestCase):
+    def testTableScoresRoundTrip(self):
+        for score in (CHECKMATE - 7, -CHECKMATE + 7, 35, -35, 0):
+            self.assertEqual(scoreFromTable(scoreToTable(score, 5), 5), score)
+        # a mate stored at ply 5 is one ply closer when read again at ply 6
+        self.assertEqual(scoreFromTable(scoreToTable(CHECKMATE - 7, 5), 6), CHECKMATE - 8)
+        self.assertEqual(scoreFromTable(scoreToTable(-CHECKMATE + 7, 5), 6), -CHECKMATE + 8)
+
+    def testMateDistanceShrinksEachMove(self):
+        gs = GameState(fen=KRRK_FEN)
+        search = Search()
+        distances = []
+        for _ in range(4):
+            result = search.iterativeDeepening(gs, 5)
+            distances.append(CHECKMATE - abs(result.score))
+            gs.makeMoveCode(result.bestMove)
+        self.assertEqual(distances, [4, 3, 2, 1])
+
+    def testTablebaseMatePastMaxPlyIsReportedAsMate(self):
+        self.assertIn("score mate 35 ", SearchResult(None, CHECKMATE - 70, 1, [], 0, 0.0).infoLine())
+        self.assertIn("score mate -35 ", SearchResult(None, -CHECKMATE + 70, 1, [], 0, 0.0).infoLine())
+
+
+class NodeLimitTest(unittest.TestCase):
+    def testSearchStopsExactlyAtTheNodeLimit(self):
+        for nodeLimit in (1, 300, 1000):
+            result = Search(useTablebases=False).iterativeDeepening(GameState(), 10, nodeLimit=nodeLimit)
+            self.assertEqual(result.nodes, nodeLimit)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,36 @@
+import io
+import unittest
+
+from chessEngine import GameState
+from smartMoveFinder import Search
+from uci import UciEngine
+
+# white is mated (fool's mate) and black to move is stalemated
+MATED_FEN = "rnb1kbnr/pppp1ppp/8/4p3/6Pq/5P2/PPPPP2P/RNBQKBNR w KQkq - 1 3"
+STALEMATED_FEN = "7k/5Q2/6K1/8/8/8/8/8 b - - 0 1"
+
+
+class GoWithoutLegalMovesTest(unittest.TestCase):
+    def goDepth(self, fen):
+        output = io.StringIO()
+        engine = UciEngine(output=output)
+        engine.handleCommand("position fen " + fen)
+        engine.handleCommand("go depth 3")
+        engine.searchThread.join(10)
+        self.assertFalse(engine.searchThread.is_alive())
+        return output.getvalue().splitlines()
+
+    def testMatedPositionAnswersNullMove(self):
+        self.assertIn("bestmove 0000", self.goDepth(MATED_FEN))
+
+    def testStalematedPositionAnswersNullMove(self):
+        self.assertIn("bestmove 0000", self.goDepth(STALEMATED_FEN))
+
+    def testSearchReturnsNoMove(self):
+        result = Search(useTablebases=False).iterativeDeepening(GameState(fen=MATED_FEN), 3)
+        self.assertIsNone(result.bestMove)
+        self.assertEqual(result.pv, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
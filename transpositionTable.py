@@ -0,0 +1,61 @@
+"""
+a fixed size hash table that remembers the results of positions
+the search has already looked at, it's indexed by the zobrist key
+of the GameState so transposed positions share the same entry
+"""
+
+# how the stored score relates to the real score of the position
+EXACT = 0
+LOWERBOUND = 1  # the search failed high, real score is >= score
+UPPERBOUND = 2  # the search failed low, real score is <= score
+
+# number of entries as a power of two so the index is just a mask
+DEFAULT_SIZE_BITS = 18
+
+
+class TranspositionTable:
+    def __init__(self, sizeBits=DEFAULT_SIZE_BITS):
+        self.size = 1 << sizeBits
+        self.mask = self.size - 1
+        self.keys = [0] * self.size
+        # each entry is (depth, score, flag, bestMove, generation), bestMove is a packed move
+        self.entries = [None] * self.size
+        self.generation = 0
+
+    def clear(self):
+        self.keys = [0] * self.size
+        self.entries = [None] * self.size
+        self.generation = 0
+
+    """
+    called once before every search so entries left over from
+    older searches can be replaced first
+    """
+
+    def newSearch(self):
+        self.generation += 1
+
+    def probe(self, key):
+        index = key & self.mask
+        if self.keys[index] == key:
+            return self.entries[index]
+        return None
+
+    """
+    replacement policy: an empty slot, the same position or an entry
+    from an older search is always overwritten, otherwise the deeper
+    search result is kept
+    """
+
+    def store(self, key, depth, score, flag, bestMove):
+        index = key & self.mask
+        entry = self.entries[index]
+        if (
+            entry is not None
+            and self.keys[index] != key
+            and entry[4] == self.generation
+            and entry[0] > depth
+        ):
+            return
+        self.keys[index] = key
+        self.entries[index] = (depth, score, flag, bestMove, self.generation)
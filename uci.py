@@ -0,0 +1,186 @@
+"""
+a UCI front end so the engine can be used by chess GUIs, tournament managers
+and analysis tools without the pygame window; it reads commands from stdin and
+answers on stdout. the search runs in its own thread so `stop` can end it at
+any time, and the same Search (transposition table, history) is kept from one
+move to the next until `ucinewgame`
+
+usage: python uci.py
+"""
+
+import sys
+import threading
+
+from chessEngine import START_FEN, GameState, Move
+from moveOrdering import MAX_PLY
+from smartMoveFinder import Search, findBookMove
+
+ENGINE_NAME = "Chess-Engine"
+ENGINE_AUTHOR = "yecrystal"
+# seconds kept back from every time limit for the last node check and the answer
+MOVE_OVERHEAD = 0.05
+# with a clock the engine plans for this many more moves when movestogo isn't given
+DEFAULT_MOVES_TO_GO = 30
+
+
+class UciEngine:
+    def __init__(self, output=sys.stdout):
+        self.output = output
+        self.outputLock = threading.Lock()
+        self.search = Search(infoCallback=self.sendInfo)
+        self.gs = GameState()
+        self.searchThread = None
+        # set while a `go infinite` search waits for `stop` before it may answer
+        self.stopRequested = threading.Event()
+
+    def send(self, line):
+        with self.outputLock:
+            self.output.write(line + "\n")
+            self.output.flush()
+
+    def sendInfo(self, line):
+        self.send("info " + line)
+
+    """
+    handles one line of input and returns False when the engine should quit
+    """
+
+    def handleCommand(self, line):
+        tokens = line.split()
+        if not tokens:
+            return True
+        command = tokens[0]
+        if command == "uci":
+            self.send("id name " + ENGINE_NAME)
+            self.send("id author " + ENGINE_AUTHOR)
+            self.send("uciok")
+        elif command == "isready":
+            self.send("readyok")
+        elif command == "ucinewgame":
+            self.stopSearch()
+            self.search.newGame()
+            self.gs = GameState()
+        elif command == "position":
+            self.stopSearch()
+            self.setPosition(tokens[1:])
+        elif command == "go":
+            self.stopSearch()
+            self.go(tokens[1:])
+        elif command == "stop":
+            self.stopSearch()
+        elif command == "quit":
+            self.stopSearch()
+            return False
+        return True
+
+    """
+    position startpos [moves m1 m2 ...]
+    position fen <fen> [moves m1 m2 ...]
+    """
+
+    def setPosition(self, tokens):
+        if "moves" in tokens:
+            movesIndex = tokens.index("moves")
+            moves = tokens[movesIndex + 1 :]
+            tokens = tokens[:movesIndex]
+        else:
+            moves = []
+        if tokens and tokens[0] == "fen":
+            fen = " ".join(tokens[1:])
+        else:
+            fen = START_FEN
+        try:
+            gs = GameState(fen=fen)
+        except ValueError as error:
+            self.sendInfo("string %s" % error)
+            return
+        for notation in moves:
+            for move in gs.getValidMoves():
+                if move.getChessNotation() == notation:
+                    gs.makeMove(move)
+                    break
+            else:
+                self.sendInfo("string illegal move %s" % notation)
+                break
+        self.gs = gs
+
+    """
+    go [depth D] [movetime MS] [wtime MS btime MS [winc MS binc MS] [movestogo N]] [nodes N] [infinite]
+    """
+
+    def go(self, tokens):
+        options = {}
+        infinite = False
+        i = 0
+        while i < len(tokens):
+            if tokens[i] == "infinite":
+                infinite = True
+                i += 1
+            elif i + 1 < len(tokens) and tokens[i + 1].lstrip("-").isdigit():
+                options[tokens[i]] = int(tokens[i + 1])
+                i += 2
+            else:
+                i += 1
+        depth = min(options.get("depth", MAX_PLY), MAX_PLY)
+        timeLimit = None
+        if "movetime" in options:
+            timeLimit = options["movetime"] / 1000
+        elif not infinite and ("wtime" in options or "btime" in options):
+            color = "w" if self.gs.whiteToMove else "b"
+            remaining = options.get(color + "time", 0) / 1000
+            increment = options.get(color + "inc", 0) / 1000
+            movesToGo = options.get("movestogo", DEFAULT_MOVES_TO_GO)
+            timeLimit = min(remaining / max(movesToGo, 1) + increment / 2, remaining / 2)
+        if timeLimit is not None:
+            timeLimit = max(timeLimit - MOVE_OVERHEAD, 0.01)
+        self.stopRequested.clear()
+        self.searchThread = threading.Thread(
+            target=self.runSearch, args=(depth, timeLimit, options.get("nodes"), infinite), daemon=True
+        )
+        self.searchThread.start()
+
+    def runSearch(self, depth, timeLimit, nodeLimit, infinite):
+        # book moves are played right away, except for analysis with `go infinite`
+        bookMove = None if infinite else findBookMove(self.gs)
+        if bookMove is not None:
+            self.send("bestmove " + Move.fromCode(bookMove).getChessNotation())
+            return
+        result = self.search.iterativeDeepening(self.gs, depth, timeLimit=timeLimit, nodeLimit=nodeLimit)
+        if infinite:
+            # the protocol wants no bestmove before `stop`, even when the search is done
+            self.stopRequested.wait()
+        if result.bestMove is None:
+            self.send("bestmove 0000")
+            return
+        bestMove = Move.fromCode(result.bestMove).getChessNotation()
+        if len(result.pv) > 1 and result.pv[0] == result.bestMove:
+            self.send("bestmove %s ponder %s" % (bestMove, Move.fromCode(result.pv[1]).getChessNotation()))
+        else:
+            self.send("bestmove " + bestMove)
+
+    """
+    ends a running search and waits for its bestmove; the search only looks at
+    its stop flag every few hundred nodes, and a stop that comes before the
+    search has started would be reset by it, so stop is repeated until it's done
+    """
+
+    def stopSearch(self):
+        if self.searchThread is None:
+            return
+        self.stopRequested.set()
+        while self.searchThread.is_alive():
+            self.search.stop()
+            self.searchThread.join(0.05)
+        self.searchThread = None
+
+
+def main():
+    engine = UciEngine()
+    for line in sys.stdin:
+        if not engine.handleCommand(line.strip()):
+            break
+    engine.stopSearch()
+
+
+if __name__ == "__main__":
+    main()